@@ -0,0 +1,78 @@
+"""
+Session Compaction Module
+ロード直後のセッションのメモリ使用量を削減します。
+数値列を可能な範囲でダウンキャストし、繰り返しの多い文字列列（Driver / Team / Compound）をカテゴリ型に変換し、
+ダッシュボードで使用しないテレメトリチャンネルを削除します。
+"""
+
+import logging
+import pandas as pd
+
+from analysis.session_cache import cached_bytes
+
+CATEGORICAL_LAP_COLUMNS = ['Driver', 'DriverNumber', 'Team', 'Compound', 'TrackStatus']
+UNUSED_POS_CHANNELS = ['Z', 'Status']
+
+
+def _downcast_numeric(df: pd.DataFrame, columns=None) -> None:
+    for col in (columns if columns is not None else df.columns):
+        if col not in df.columns:
+            continue
+        dtype = df[col].dtype
+        if pd.api.types.is_float_dtype(dtype):
+            df[col] = pd.to_numeric(df[col], downcast='float')
+        elif pd.api.types.is_integer_dtype(dtype):
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+
+
+def _to_categorical(df: pd.DataFrame, columns) -> None:
+    for col in columns:
+        if col in df.columns and df[col].dtype == object:
+            df[col] = df[col].astype('category')
+
+
+def _private_frame(session, attr):
+    # 未ロードのプロパティにアクセスすると例外になるため内部属性を直接参照する
+    return getattr(session, attr, None)
+
+
+def compact_session(session) -> None:
+    """`session` のデータフレームをその場で軽量化する。"""
+    laps = _private_frame(session, '_laps')
+    if laps is not None and len(laps) > 0:
+        _to_categorical(laps, CATEGORICAL_LAP_COLUMNS)
+        _downcast_numeric(laps)
+
+    weather = _private_frame(session, '_weather_data')
+    if weather is not None and len(weather) > 0:
+        _downcast_numeric(weather)
+
+    car_data = _private_frame(session, '_car_data') or {}
+    for tel in car_data.values():
+        _downcast_numeric(tel, ['Speed', 'RPM', 'Throttle', 'nGear', 'DRS'])
+
+    pos_data = _private_frame(session, '_pos_data') or {}
+    for tel in pos_data.values():
+        tel.drop(columns=[c for c in UNUSED_POS_CHANNELS if c in tel.columns], inplace=True)
+        _downcast_numeric(tel, ['X', 'Y'])
+
+    logging.info(f"Compacted session {getattr(session, 'name', '')}: "
+                 f"laps={laps.memory_usage(deep=True).sum() if laps is not None else 0} bytes")
+
+
+def estimate_session_bytes(session) -> int:
+    """ロード済みセッションのおおよそのメモリ使用量（bytes）。データフレームと、セッション単位でキャッシュした計算結果の合計。"""
+    return estimate_frame_bytes(session) + cached_bytes(session)
+
+
+def estimate_frame_bytes(session) -> int:
+    """ロード済みセッションが保持するデータフレームのおおよそのメモリ使用量（bytes）。"""
+    total = 0
+    for attr in ('_laps', '_weather_data', '_results', '_track_status', '_race_control_messages'):
+        df = _private_frame(session, attr)
+        if isinstance(df, pd.DataFrame):
+            total += int(df.memory_usage(deep=True).sum())
+    for attr in ('_car_data', '_pos_data'):
+        for tel in (_private_frame(session, attr) or {}).values():
+            total += int(tel.memory_usage(deep=True).sum())
+    return total
@@ -0,0 +1,115 @@
+"""
+Track Dominance Module
+各ドライバーの最速ラップについて、ラップ内の経過時間を共通の距離グリッド（周回割合 0〜1 を GRID 分割）上に
+全ドライバー分まとめて一度だけリサンプリングして保持します。ミニセクター数 N を変えても、グリッド上の累積時間を N+1 点で引くだけで
+各ミニセクターの通過時間が得られるため、再計算は行列の差分と argmin だけで済みます。
+ドライバーの組み合わせと N ごとの結果もセッション単位でキャッシュします。
+"""
+
+import logging
+import threading
+import numpy as np
+
+from analysis.session_cache import get_cached
+from analysis.telemetry_store import get_telemetry_store
+
+_PROFILE_KEY = "dominance_profile"
+GRID = 1000
+
+
+class DominanceProfile:
+    def __init__(self, drivers, cumulative_times, outline, outline_fraction, lap_numbers):
+        self.drivers = list(drivers)              # 行の並び順
+        self.cumulative_times = cumulative_times  # (ドライバー数, GRID + 1) 各グリッド点までの経過時間 [s]
+        self.outline = outline                    # (P, 2) コース形状（最速ラップの位置データ X, Y）
+        self.outline_fraction = outline_fraction  # (P,) 各点の周回割合
+        self.lap_numbers = lap_numbers            # Abbreviation -> 使用したラップ番号
+        self._row = {drv: i for i, drv in enumerate(self.drivers)}
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def sector_times(self, drivers, n):
+        """(len(drivers), n) のミニセクター通過時間。"""
+        edges = np.round(np.linspace(0, GRID, n + 1)).astype(int)
+        rows = [self._row[d] for d in drivers]
+        return np.diff(self.cumulative_times[rows][:, edges], axis=1)
+
+    def winners(self, drivers, n):
+        """ミニセクターごとの最速ドライバー（長さ n の配列）。プロファイルの無いドライバーは無視する。"""
+        drivers = tuple(sorted(d for d in drivers if d in self._row))
+        key = (drivers, n)
+        with self._lock:
+            if key in self._results:
+                return self._results[key]
+        if drivers:
+            times = self.sector_times(drivers, n)
+            result = np.asarray(drivers, dtype=object)[np.argmin(times, axis=0)]
+        else:
+            result = np.empty(0, dtype=object)
+        with self._lock:
+            return self._results.setdefault(key, result)
+
+    def outline_sectors(self, n):
+        """コース形状の各点が属するミニセクター番号。"""
+        return np.minimum((self.outline_fraction * n).astype(int), n - 1)
+
+
+def _lap_fraction_and_time(tel):
+    distance = tel['Distance'].astype(np.float64)
+    if len(distance) < 2 or distance[-1] <= 0:
+        return None
+    # 距離は単調増加のはずだが、停止中の重複サンプルに備えて累積最大値で整える
+    fraction = np.maximum.accumulate(distance) / distance[-1]
+    return fraction, tel['SessionTime'] - tel['SessionTime'][0]
+
+
+def _resample_all(fractions, elapsed):
+    """全ドライバーのサンプルを一度の np.interp で共通グリッドへリサンプリングする。
+    ドライバー i の周回割合を 2*i だけずらして連結すると x が全体で単調増加になるため、1 回の補間で済む。"""
+    n = len(fractions)
+    offsets = 2.0 * np.arange(n)
+    x = np.concatenate([f + o for f, o in zip(fractions, offsets)])
+    y = np.concatenate(elapsed)
+    grid = (np.linspace(0.0, 1.0, GRID + 1)[None, :] + offsets[:, None]).ravel()
+    return np.interp(grid, x, y).reshape(n, GRID + 1)
+
+
+def _build_outline(session):
+    lap = session.laps.pick_fastest()
+    if lap is None:
+        return None, None
+    try:
+        pos = lap.get_pos_data()
+    except Exception as e:
+        logging.warning(f"Position data not available for dominance map: {e}")
+        return None, None
+    if pos is None or len(pos) < 2:
+        return None, None
+    xy = pos.loc[:, ('X', 'Y')].to_numpy(dtype=np.float64)
+    step = np.hypot(*np.diff(xy, axis=0).T)
+    cumulative = np.concatenate([[0.0], np.cumsum(step)])
+    if cumulative[-1] <= 0:
+        return None, None
+    return xy.astype(np.float32), (cumulative / cumulative[-1]).astype(np.float32)
+
+
+def build_dominance_profile(session) -> DominanceProfile:
+    store = get_telemetry_store(session)
+    drivers, fractions, elapsed, lap_numbers = [], [], [], {}
+    for drv in store.drivers:
+        lap_number = store.fastest_lap_number(drv)
+        tel = store.lap(drv, lap_number) if lap_number is not None else None
+        sampled = _lap_fraction_and_time(tel) if tel is not None else None
+        if sampled is None:
+            continue
+        drivers.append(drv)
+        fractions.append(sampled[0])
+        elapsed.append(sampled[1])
+        lap_numbers[drv] = lap_number
+    times = _resample_all(fractions, elapsed) if drivers else np.empty((0, GRID + 1))
+    outline, fraction = _build_outline(session)
+    return DominanceProfile(drivers, times, outline, fraction, lap_numbers)
+
+
+def get_dominance_profile(session) -> DominanceProfile:
+    return get_cached(session, _PROFILE_KEY, build_dominance_profile)
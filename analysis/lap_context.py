@@ -0,0 +1,80 @@
+"""
+Lap Context Module
+各ラップに、そのラップ終了時刻（Time）以前で最新のトラックステータスと天候（路面温度・気温・降雨）を付与します。
+Caution（SC / VSC / 赤旗）は、ラップ終了時点の状態に加えて周回中に出たステータスも含めて判定します。
+天候とトラックステータスを時刻順の一本のタイムラインにまとめ（前方補完）、ラップ側も時刻順に並べた上で
+`pd.merge_asof` を一度だけ実行するため、ラップごとの検索は行いません。結果はセッション単位でキャッシュします。
+"""
+
+import logging
+import pandas as pd
+
+from analysis.session_cache import get_cached
+
+_CONTEXT_KEY = "lap_context"
+WEATHER_COLUMNS = ['TrackTemp', 'AirTemp', 'Rainfall']
+# SC 出動 / 赤旗 / VSC 出動 / VSC 終了
+CAUTION_STATUSES = {'4', '5', '6', '7'}
+
+
+def _timeline(session):
+    """天候とトラックステータスを時刻順に並べ、各時点の最新値を前方補完したタイムライン。"""
+    parts = []
+    weather = getattr(session, '_weather_data', None)  # 未ロード時にプロパティが例外を出すため内部属性を参照する
+    if weather is not None and len(weather) > 0:
+        weather = weather[['Time'] + [c for c in WEATHER_COLUMNS if c in weather.columns]]
+        if 'Rainfall' in weather.columns: # 欠損を含めて前方補完できるよう数値（0/1）で扱う
+            weather = weather.assign(Rainfall=weather['Rainfall'].astype('float32'))
+        parts.append(weather)
+    status = getattr(session, '_track_status', None)
+    if status is not None and len(status) > 0:
+        parts.append(status[['Time', 'Status']].rename(columns={'Status': 'TrackStatus'}))
+    if not parts:
+        return None
+    timeline = pd.concat(parts, ignore_index=True)
+    timeline['Time'] = timeline['Time'].astype('timedelta64[ns]')
+    timeline = timeline.sort_values('Time', kind='stable').ffill()
+    return timeline.drop_duplicates('Time', keep='last')
+
+
+def build_lap_context(session) -> pd.DataFrame:
+    """session.laps と同じインデックスを持ち、TrackStatus / TrackTemp / AirTemp / Rainfall / Caution / Wet 列を持つ表。"""
+    laps = session.laps
+    context = pd.DataFrame(index=laps.index, columns=['TrackStatus'] + WEATHER_COLUMNS)
+    timeline = _timeline(session)
+    if timeline is not None and len(laps) > 0:
+        keys = pd.DataFrame({'Time': laps['Time'].astype('timedelta64[ns]'), 'LapIndex': laps.index})
+        keys = keys.dropna(subset=['Time']).sort_values('Time', kind='stable')
+        merged = pd.merge_asof(keys, timeline, on='Time', direction='backward')
+        context = merged.set_index('LapIndex').drop(columns='Time').reindex(laps.index)
+        context.index.name = laps.index.name
+    else:
+        logging.warning("No weather or track status data; lap context is empty")
+    for col in ['TrackStatus'] + WEATHER_COLUMNS:
+        if col not in context.columns:
+            context[col] = pd.NA
+    context = context[['TrackStatus'] + WEATHER_COLUMNS].copy()
+    # ラップ終了時点の状態に加え、FastF1 がラップごとに記録した「周回中に出たステータスの連結文字列」（例: '125'）も見る。
+    # 周回の途中で始まり途中で終わった SC / VSC / 赤旗も対象にするため
+    caution = context['TrackStatus'].isin(CAUTION_STATUSES).to_numpy(dtype=bool)
+    if 'TrackStatus' in laps.columns:
+        during_lap = laps['TrackStatus'].astype(str).str.contains(f"[{''.join(sorted(CAUTION_STATUSES))}]", regex=True)
+        caution |= during_lap.to_numpy(dtype=bool)
+    context['Caution'] = caution
+    context['Wet'] = pd.to_numeric(context['Rainfall'], errors='coerce').fillna(0) > 0
+    return context
+
+
+def get_lap_context(session) -> pd.DataFrame:
+    return get_cached(session, _CONTEXT_KEY, build_lap_context)
+
+
+def affected_mask(session, index, caution=False, wet=False) -> pd.Series:
+    """`index`（session.laps のインデックスの部分集合）のうち、除外対象の周回を True とするマスク。"""
+    context = get_lap_context(session).reindex(index)
+    mask = pd.Series(False, index=index)
+    if caution:
+        mask |= context['Caution'].to_numpy(dtype=bool)
+    if wet:
+        mask |= context['Wet'].to_numpy(dtype=bool)
+    return mask
@@ -0,0 +1,83 @@
+"""
+Race Progress Module
+決勝（スプリント）の全ドライバーについて、各周回終了時点のリーダーとの差（秒）と順位を計算します。
+各周回の終了時刻（セッション時刻 `Time`）から、その周回を最初に終えたドライバーの時刻を groupby で一度に引き、
+ドライバー × 周回の行列に展開するため、ドライバーごとの Python ループはありません。
+ラップタイムの累積和と違い、途中のラップ行やラップタイムが欠けても誤差が積み重なりません（終了時刻が無い周回は NaN）。行列はそのまま描画用の線分配列と、ホバー時の周回検索の索引になります。
+"""
+
+import numpy as np
+import pandas as pd
+
+from analysis.session_cache import get_cached
+
+_PROGRESS_KEY = "race_progress"
+RACE_SESSIONS = {'Race', 'Sprint'}
+
+
+class RaceProgress:
+    def __init__(self, drivers, lap_numbers, gaps, positions):
+        self.drivers = list(drivers)       # 最終周の順位順
+        self.lap_numbers = lap_numbers     # (L,) 周回番号
+        self.gaps = gaps                   # (D, L) リーダーとの差 [s]、未完了の周回は NaN
+        self.positions = positions         # (D, L) 順位、未完了の周回は NaN
+        self._row = {drv: i for i, drv in enumerate(self.drivers)}
+        # ホバー用の索引: 各周回の列を順位順に並べた行番号（未完了は末尾）
+        self._order = np.argsort(np.where(np.isnan(positions), np.inf, positions), axis=0, kind='stable')
+
+    def row(self, driver):
+        return self._row.get(driver)
+
+    def lines(self, kind):
+        """LineCollection 用の (D, L, 2) 配列。NaN の点で線は途切れる。"""
+        values = self.gaps if kind == "gap" else self.positions
+        x = np.broadcast_to(self.lap_numbers, values.shape)
+        return np.stack([x, values], axis=-1)
+
+    def lap_column(self, lap):
+        """周回番号 -> 列番号（範囲外なら None）。"""
+        i = int(np.searchsorted(self.lap_numbers, lap))
+        if i >= len(self.lap_numbers) or self.lap_numbers[i] != lap:
+            return None
+        return i
+
+    def lookup(self, lap):
+        """指定周回の (順位, ドライバー, ギャップ) を順位順で返す。"""
+        col = self.lap_column(lap)
+        if col is None:
+            return []
+        positions, gaps = self.positions[:, col], self.gaps[:, col]
+        order = self._order[:, col]
+        return [(int(positions[i]), self.drivers[i], float(gaps[i]))
+                for i in order if not np.isnan(positions[i])]
+
+
+def build_race_progress(session) -> RaceProgress:
+    laps = session.laps
+    df = pd.DataFrame({
+        'Driver': laps['Driver'].astype(str).to_numpy(),
+        'LapNumber': laps['LapNumber'].to_numpy(dtype=float),
+        'Finished': laps['Time'].dt.total_seconds().to_numpy(), # 周回終了時のセッション時刻
+        'Position': laps['Position'].to_numpy(dtype=float) if 'Position' in laps.columns else np.nan,
+    }).dropna(subset=['LapNumber']).sort_values(['Driver', 'LapNumber'], kind='stable')
+
+    df['Gap'] = df['Finished'] - df.groupby('LapNumber')['Finished'].transform('min')
+    # タイミングデータに順位が無い周回は終了時刻の順位で補う
+    df['Position'] = df['Position'].fillna(df.groupby('LapNumber')['Finished'].rank(method='first'))
+
+    gaps = df.pivot(index='Driver', columns='LapNumber', values='Gap')
+    positions = df.pivot(index='Driver', columns='LapNumber', values='Position').reindex_like(gaps)
+    if gaps.empty:
+        return RaceProgress([], np.empty(0), np.empty((0, 0)), np.empty((0, 0)))
+
+    # 最後に記録された順位の順に並べる（周回遅れ・リタイアは後ろ）
+    completed = positions.notna().sum(axis=1)
+    final_position = positions.ffill(axis=1).iloc[:, -1]
+    order = pd.DataFrame({'laps': -completed, 'pos': final_position}).sort_values(['laps', 'pos']).index
+    gaps, positions = gaps.loc[order], positions.loc[order]
+    return RaceProgress(order, gaps.columns.to_numpy(dtype=float),
+                        gaps.to_numpy(dtype=float), positions.to_numpy(dtype=float))
+
+
+def get_race_progress(session) -> RaceProgress:
+    return get_cached(session, _PROGRESS_KEY, build_race_progress)
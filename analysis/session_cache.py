@@ -0,0 +1,96 @@
+"""
+Session Cache Module
+ロード済みセッションに紐づく計算結果（メタデータ、集計表など）を保持するキャッシュです。
+セッションオブジェクトを弱参照キーとして保持するため、セッションが破棄されるとキャッシュも自動的に解放されます。
+"""
+
+import sys
+import threading
+import weakref
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+_CACHE = weakref.WeakKeyDictionary()
+_INFLIGHT = weakref.WeakKeyDictionary()  # session -> {key: Future}（計算中の値）
+_LOCK = threading.RLock()
+
+
+def get_cached(session, key, builder):
+    """`session` に紐づく `key` の値を返す。未計算なら `builder(session)` を呼んで保存する。
+
+    同じ値を別のスレッドが計算中の場合（事前計算タスクの完了前にタブを開いた場合など）は、
+    もう一度計算せずにその結果を待って共有する。
+    """
+    with _LOCK:
+        entry = _CACHE.get(session)
+        if entry is not None and key in entry:
+            return entry[key]
+        inflight = _INFLIGHT.setdefault(session, {})
+        fut = inflight.get(key)
+        owner = fut is None
+        if owner:
+            fut = inflight[key] = Future()
+    if not owner:
+        return fut.result()
+
+    # ビルダーはロック外で実行する（重い計算で他セッションをブロックしないため）
+    try:
+        value = builder(session)
+    except BaseException as e:
+        with _LOCK:
+            _INFLIGHT.get(session, {}).pop(key, None)
+        fut.set_exception(e)
+        raise
+
+    with _LOCK:
+        entry = _CACHE.setdefault(session, {})
+        value = entry.setdefault(key, value)
+        _INFLIGHT.get(session, {}).pop(key, None)
+    fut.set_result(value)
+    return value
+
+
+def peek_cached(session, key, default=None):
+    """計算を行わずにキャッシュ済みの値だけを返す。"""
+    with _LOCK:
+        entry = _CACHE.get(session)
+        if entry is None:
+            return default
+        return entry.get(key, default)
+
+
+def release(session):
+    """`session` に紐づくキャッシュを明示的に破棄する（置き換えられたセッションの解放用）。"""
+    with _LOCK:
+        _CACHE.pop(session, None)
+        _INFLIGHT.pop(session, None)
+
+
+def cached_bytes(session) -> int:
+    """`session` に紐づくキャッシュ済みの計算結果（テレメトリ索引・集計表など）のおおよそのメモリ使用量（bytes）。"""
+    with _LOCK:
+        values = list(_CACHE.get(session, {}).values())
+    seen = {id(session)} # 計算結果がセッションを参照していても、セッション本体は数えない
+    return sum(_nbytes(v, seen) for v in values)
+
+
+def _nbytes(obj, seen):
+    # 同じオブジェクト（別の結果と共有している配列など）は一度だけ数える
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(_nbytes(v, seen) for v in obj.values())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(_nbytes(v, seen) for v in obj)
+    if hasattr(obj, '__dict__') and not isinstance(obj, type):
+        return sys.getsizeof(obj) + _nbytes(vars(obj), seen)
+    return sys.getsizeof(obj)
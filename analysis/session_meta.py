@@ -0,0 +1,85 @@
+"""
+Session Metadata Module
+セッションに参加したドライバーの略称・番号・チーム・描画色・線種、およびタイヤコンパウンドの配色を
+一つのテーブルにまとめます。ワーカースレッドでロード直後に一度だけ構築し、サイドバーと各タブはここから参照します。
+"""
+
+import logging
+import pandas as pd
+import fastf1.plotting
+
+from analysis.session_cache import get_cached
+
+_META_KEY = "session_meta"
+_DEFAULT_STYLE = {'color': '#BBBBBB', 'linestyle': 'solid'}
+
+
+class SessionMeta:
+    def __init__(self, drivers: pd.DataFrame, compound_mapping: dict):
+        # drivers: Abbreviation をインデックスとし、Number / Team / Color / LineStyle を列に持つ
+        self.drivers = drivers
+        self.compound_mapping = compound_mapping
+
+    @property
+    def abbreviations(self):
+        return sorted(self.drivers.index)
+
+    def driver_style(self, abbreviation):
+        if abbreviation not in self.drivers.index:
+            return dict(_DEFAULT_STYLE)
+        row = self.drivers.loc[abbreviation]
+        return {'color': row['Color'], 'linestyle': row['LineStyle']}
+
+    def team(self, abbreviation):
+        if abbreviation not in self.drivers.index:
+            return None
+        return self.drivers.at[abbreviation, 'Team']
+
+
+def _build_driver_table(session) -> pd.DataFrame:
+    results = getattr(session, 'results', None)
+    columns = ['Number', 'Team', 'Color', 'LineStyle']
+    if results is None or len(results) == 0 or 'Abbreviation' not in results.columns:
+        return pd.DataFrame(columns=columns, index=pd.Index([], name='Abbreviation'))
+
+    df = pd.DataFrame({
+        'Abbreviation': results['Abbreviation'].astype(str),
+        'Number': results['DriverNumber'].astype(str) if 'DriverNumber' in results.columns else '',
+        'Team': results['TeamName'] if 'TeamName' in results.columns else None,
+    })
+    df = df[df['Abbreviation'].str.len() > 0].drop_duplicates('Abbreviation').set_index('Abbreviation')
+
+    # チームカラーを既定値とし、FastF1 のスタイル定義が取れるドライバーは上書きする
+    if 'TeamColor' in results.columns:
+        team_colors = results.set_index(results['Abbreviation'].astype(str))['TeamColor']
+        team_colors = team_colors[~team_colors.index.duplicated()].reindex(df.index).fillna('').astype(str)
+        df['Color'] = ('#' + team_colors).where(team_colors.str.len() > 0, _DEFAULT_STYLE['color'])
+    else:
+        df['Color'] = _DEFAULT_STYLE['color']
+    df['LineStyle'] = _DEFAULT_STYLE['linestyle']
+
+    for abbr in df.index:
+        try:
+            style = fastf1.plotting.get_driver_style(identifier=abbr,
+                                                     style=['color', 'linestyle'],
+                                                     session=session)
+        except Exception:
+            continue
+        df.at[abbr, 'Color'] = style.get('color', df.at[abbr, 'Color'])
+        df.at[abbr, 'LineStyle'] = style.get('linestyle', df.at[abbr, 'LineStyle'])
+
+    return df[columns]
+
+
+def build_session_meta(session) -> SessionMeta:
+    drivers = _build_driver_table(session)
+    try:
+        compound_mapping = fastf1.plotting.get_compound_mapping(session=session)
+    except Exception as e:
+        logging.warning(f"Could not resolve compound mapping: {e}")
+        compound_mapping = {}
+    return SessionMeta(drivers, compound_mapping)
+
+
+def get_session_meta(session) -> SessionMeta:
+    return get_cached(session, _META_KEY, build_session_meta)
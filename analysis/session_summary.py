@@ -0,0 +1,60 @@
+"""
+Session Summary Module
+セッション間比較に使う小さな要約（クイックラップのラップタイム表と、各ドライバーの最速ラップ速度波形）を
+セッションごとに一度だけ計算して保持します。比較対象のセッションを追加しても、既存セッションの要約は再計算されません。
+"""
+
+import numpy as np
+import pandas as pd
+
+from analysis.session_cache import get_cached
+from analysis.telemetry_store import get_telemetry_store
+
+_SUMMARY_KEY = "session_summary"
+
+
+class SessionSummary:
+    def __init__(self, lap_times: pd.DataFrame, speed_traces: dict):
+        # lap_times: Driver / LapNumber / LapTime_s（クイックラップのみ）
+        self.lap_times = lap_times
+        # speed_traces: Abbreviation -> (ラップ番号, Distance 配列, Speed 配列)
+        self.speed_traces = speed_traces
+
+    @property
+    def drivers(self):
+        return sorted(self.lap_times['Driver'].unique())
+
+    def fastest_driver(self):
+        if self.lap_times.empty:
+            return None
+        return self.lap_times.loc[self.lap_times['LapTime_s'].idxmin(), 'Driver']
+
+    def speed_trace(self, abbreviation):
+        return self.speed_traces.get(abbreviation)
+
+
+def _build_lap_times(session) -> pd.DataFrame:
+    laps = session.laps.pick_quicklaps()
+    df = pd.DataFrame({
+        'Driver': laps['Driver'].astype(str).to_numpy(),
+        'LapNumber': laps['LapNumber'].to_numpy(),
+        'LapTime_s': laps['LapTime'].dt.total_seconds().to_numpy(dtype=np.float32),
+    })
+    return df.dropna(subset=['LapTime_s']).reset_index(drop=True)
+
+
+def build_session_summary(session) -> SessionSummary:
+    store = get_telemetry_store(session)
+    traces = {}
+    for drv in store.drivers:
+        lap_number = store.fastest_lap_number(drv)
+        tel = store.lap(drv, lap_number) if lap_number is not None else None
+        if tel is None or len(tel['Distance']) == 0:
+            continue
+        # テレメトリ全体への参照を残さないよう、最速ラップ分だけをコピーして保持する
+        traces[drv] = (lap_number, tel['Distance'].astype(np.float32), tel['Speed'].astype(np.float32))
+    return SessionSummary(_build_lap_times(session), traces)
+
+
+def get_session_summary(session) -> SessionSummary:
+    return get_cached(session, _SUMMARY_KEY, build_session_summary)
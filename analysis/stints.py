@@ -0,0 +1,75 @@
+"""
+Stint Analysis Module
+全ドライバーのラップをスティント単位に分割し、燃料補正後のタイヤデグラデーション（秒/周）を推定します。
+スティントごとの最小二乗直線は groupby による一括集計（Σx, Σy, Σxy, Σx²）から求め、ドライバー単位のループは行いません。
+"""
+
+import numpy as np
+import pandas as pd
+
+from config import FUEL_CORRECTION_S_PER_LAP, MIN_STINT_LAPS
+from analysis.session_cache import get_cached
+
+_STINT_KEY = "stint_model"
+STINT_COLUMNS = ['Compound', 'StartLap', 'EndLap', 'Laps', 'Slope', 'Intercept']
+
+
+def _clean_laps(session) -> pd.DataFrame:
+    laps = session.laps.pick_quicklaps()
+    df = pd.DataFrame({
+        'Driver': laps['Driver'],
+        'Stint': laps['Stint'],
+        'Compound': laps['Compound'],
+        'LapNumber': laps['LapNumber'].astype(float),
+        'LapTime_s': laps['LapTime'].dt.total_seconds(),
+    })
+    # ピットイン/アウトラップはタイヤ以外の要因でタイムが崩れるため除外する
+    in_out = laps['PitInTime'].notna() | laps['PitOutTime'].notna()
+    return df[~in_out.to_numpy()].dropna(subset=['Driver', 'Stint', 'LapNumber', 'LapTime_s'])
+
+
+def fit_stints(laps: pd.DataFrame) -> pd.DataFrame:
+    """
+    `Driver`, `Stint`, `Compound`, `LapNumber`, `LapTime_s` 列を持つラップ表からスティントごとの回帰直線を求める。
+    戻り値は (Driver, Stint) をインデックスとし、燃料補正後タイム = Intercept + Slope * LapNumber を表す。
+    """
+    if laps.empty:
+        return pd.DataFrame(columns=STINT_COLUMNS,
+                            index=pd.MultiIndex.from_arrays([[], []], names=['Driver', 'Stint']))
+
+    x = laps['LapNumber'].to_numpy(dtype=float)
+    # 周回が進むほど燃料が軽くなる分を足し戻し、タイヤ由来の劣化だけを残す
+    y = laps['LapTime_s'].to_numpy(dtype=float) + FUEL_CORRECTION_S_PER_LAP * (x - 1)
+
+    work = pd.DataFrame({'Driver': laps['Driver'].to_numpy(), 'Stint': laps['Stint'].to_numpy(),
+                         'Compound': laps['Compound'].to_numpy(),
+                         'x': x, 'y': y, 'xx': x * x, 'xy': x * y})
+    grouped = work.groupby(['Driver', 'Stint'], sort=True, observed=True)
+    sums = grouped[['x', 'y', 'xx', 'xy']].sum()
+    n = grouped.size().astype(float)
+
+    denom = n * sums['xx'] - sums['x'] ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (n * sums['xy'] - sums['x'] * sums['y']) / denom
+    slope = slope.where((n >= MIN_STINT_LAPS) & (denom > 0))
+    intercept = (sums['y'] - slope * sums['x']) / n
+
+    result = pd.DataFrame({
+        'Compound': grouped['Compound'].first(),
+        'StartLap': grouped['x'].min(),
+        'EndLap': grouped['x'].max(),
+        'Laps': n.astype(int),
+        'Slope': slope,
+        'Intercept': intercept,
+    })
+    return result[STINT_COLUMNS]
+
+
+def get_stint_model(session) -> pd.DataFrame:
+    return get_cached(session, _STINT_KEY, lambda s: fit_stints(_clean_laps(s)))
+
+
+def fitted_lap_times(stint_row, lap_numbers):
+    """回帰直線を燃料補正前（実測と同じ尺度）のラップタイムに戻して返す。"""
+    lap_numbers = np.asarray(lap_numbers, dtype=float)
+    return stint_row['Intercept'] + stint_row['Slope'] * lap_numbers - FUEL_CORRECTION_S_PER_LAP * (lap_numbers - 1)
@@ -0,0 +1,154 @@
+"""
+Telemetry Store Module
+セッション全体のカーデータ（速度・スロットル・ブレーキ等）をドライバーごとに連続した numpy 配列として保持し、
+ラップ番号からサンプル位置へのオフセット索引を事前計算します。
+任意のラップ（複数可）はコピーを伴わないスライスとして取り出せるため、ラップ選択を即座に反映できます。
+"""
+
+import logging
+import numpy as np
+
+from analysis.session_cache import get_cached
+
+_STORE_KEY = "telemetry_store"
+CHANNELS = ['Speed', 'RPM', 'nGear', 'Throttle', 'Brake', 'DRS']
+
+
+class LapIndex:
+    def __init__(self, lap_numbers, starts, stops):
+        self.lap_numbers = lap_numbers  # ソート済みのラップ番号
+        self.starts = starts            # 各ラップ先頭サンプルの位置
+        self.stops = stops              # 各ラップ末尾の次のサンプル位置
+
+    def locate(self, lap_number):
+        i = np.searchsorted(self.lap_numbers, lap_number)
+        if i >= len(self.lap_numbers) or self.lap_numbers[i] != lap_number:
+            return None
+        return int(self.starts[i]), int(self.stops[i])
+
+
+class TelemetryStore:
+    def __init__(self):
+        self._arrays = {}   # Abbreviation -> {channel: ndarray}
+        self._index = {}    # Abbreviation -> LapIndex
+        self._fastest = {}  # Abbreviation -> 最速ラップ番号
+
+    def add_driver(self, abbreviation, arrays, lap_index, fastest_lap=None):
+        self._arrays[abbreviation] = arrays
+        self._index[abbreviation] = lap_index
+        if fastest_lap is not None:
+            self._fastest[abbreviation] = fastest_lap
+
+    @property
+    def drivers(self):
+        return sorted(self._arrays)
+
+    def lap_numbers(self, abbreviation):
+        index = self._index.get(abbreviation)
+        return [] if index is None else [int(n) for n in index.lap_numbers]
+
+    def arrays(self, abbreviation):
+        """ドライバーのセッション全体のチャンネル配列（dict）。"""
+        return self._arrays.get(abbreviation)
+
+    def lap_index(self, abbreviation):
+        return self._index.get(abbreviation)
+
+    def fastest_lap_number(self, abbreviation):
+        return self._fastest.get(abbreviation)
+
+    def lap(self, abbreviation, lap_number):
+        """指定ラップのチャンネル配列（元配列のビュー）を dict で返す。存在しなければ None。"""
+        index = self._index.get(abbreviation)
+        if index is None:
+            return None
+        bounds = index.locate(lap_number)
+        if bounds is None:
+            return None
+        start, stop = bounds
+        return {name: arr[start:stop] for name, arr in self._arrays[abbreviation].items()}
+
+    def window(self, abbreviation, lap_number, x0=None, x1=None, points=None):
+        """ラップの距離範囲 [x0, x1] のチャンネル配列を返す（両端の外側 1 点を含む）。無ければ None。
+
+        範囲内の点数が `points` を超える場合だけ、速度の区間ごとの最小・最大の 2 点に間引いて返す
+        （ピークを残したまま描画点数を抑える）。カーデータは 1 ラップ数百点のため、通常はビューのまま返る。
+        """
+        tel = self.lap(abbreviation, lap_number)
+        if tel is None:
+            return None
+        distance = tel['Distance']
+        lo = 0 if x0 is None else max(int(np.searchsorted(distance, x0, side='left')) - 1, 0)
+        hi = len(distance) if x1 is None else min(int(np.searchsorted(distance, x1, side='right')) + 1, len(distance))
+        tel = {name: arr[lo:hi] for name, arr in tel.items()}
+        if points is None or hi - lo <= points or 'Speed' not in tel:
+            return tel
+        factor = -(-(hi - lo) * 2 // points)
+        bins = (hi - lo) // factor
+        blocks = tel['Speed'][:bins * factor].reshape(bins, factor)
+        pairs = np.sort(np.stack([blocks.argmin(axis=1), blocks.argmax(axis=1)], axis=1), axis=1)
+        # 端数の点はそのまま残し、区間内で最小と最大が同じ点になる場合の重複を除く
+        idx = np.unique(np.append((pairs + (np.arange(bins) * factor)[:, None]).ravel(), np.arange(bins * factor, hi - lo)))
+        return {name: arr[idx] for name, arr in tel.items()}
+
+    def laps(self, abbreviation, lap_numbers):
+        """複数ラップ分のスライスを (lap_number, dict) のリストで返す。"""
+        out = []
+        for lap_number in lap_numbers:
+            tel = self.lap(abbreviation, lap_number)
+            if tel is not None and len(tel['Distance']) > 0:
+                out.append((lap_number, tel))
+        return out
+
+
+def _build_driver_arrays(car_data, driver_laps):
+    t = car_data['SessionTime'].dt.total_seconds().to_numpy(dtype=np.float64)
+    arrays = {'SessionTime': t}
+    for ch in CHANNELS:
+        if ch in car_data.columns:
+            arrays[ch] = np.ascontiguousarray(car_data[ch].to_numpy())
+
+    bounds = driver_laps[['LapNumber', 'LapStartTime', 'Time']].dropna().sort_values('LapNumber')
+    lap_numbers = bounds['LapNumber'].to_numpy(dtype=np.float64)
+    starts = np.searchsorted(t, bounds['LapStartTime'].dt.total_seconds().to_numpy(), side='left')
+    stops = np.searchsorted(t, bounds['Time'].dt.total_seconds().to_numpy(), side='left')
+
+    # セッション全体で速度を積分し、各サンプルが属するラップの先頭からの距離に変換する
+    speed = arrays.get('Speed', np.zeros_like(t)).astype(np.float64)
+    dt = np.diff(t, prepend=t[0] if len(t) else 0.0)
+    cumulative = np.cumsum(speed / 3.6 * dt)
+    lap_of_sample = np.searchsorted(starts, np.arange(len(t)), side='right') - 1
+    if len(starts):
+        lap_start = np.minimum(starts[np.clip(lap_of_sample, 0, None)], max(len(t) - 1, 0))
+        base = np.where(lap_of_sample >= 0, cumulative[lap_start], 0.0)
+    else:
+        base = 0.0
+    arrays['Distance'] = cumulative - base
+
+    return arrays, LapIndex(lap_numbers, starts, stops)
+
+
+def build_telemetry_store(session) -> TelemetryStore:
+    store = TelemetryStore()
+    laps = session.laps
+    try:
+        car_data = session.car_data
+    except Exception as e:
+        logging.warning(f"Car data not available for telemetry store: {e}")
+        return store
+
+    for drv_num, tel in car_data.items():
+        driver_laps = laps[laps['DriverNumber'] == str(drv_num)]
+        if tel is None or tel.empty or driver_laps.empty:
+            continue
+        abbreviation = driver_laps['Driver'].iloc[0]
+        arrays, index = _build_driver_arrays(tel, driver_laps)
+        # 削除されたラップ（トラックリミット違反など）を除くため、自己ベストに記録されたラップから選ぶ
+        fastest_lap = driver_laps.pick_fastest()
+        fastest = None if fastest_lap is None else int(fastest_lap['LapNumber'])
+        store.add_driver(abbreviation, arrays, index, fastest)
+    return store
+
+
+def get_telemetry_store(session) -> TelemetryStore:
+    return get_cached(session, _STORE_KEY, build_telemetry_store)
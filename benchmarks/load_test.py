@@ -0,0 +1,122 @@
+"""
+Load Test: dashboard server
+server.py で起動したサーバーに多数のクライアントから同時に要求を送り、スループットとレイテンシ（p50 / p95）を報告します。
+
+例:
+    python server.py --offline &
+    python benchmarks/load_test.py --clients 32 --requests 2000 \
+        --session "2025:Saudi Arabian Grand Prix:Q" --drivers VER,PIA,LEC
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import SERVER_HOST, SERVER_PORT
+
+ENDPOINTS = ["/api/session", "/api/laptimes", "/api/speed", "/chart/laptimes.png", "/chart/speed.png"]
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return float("nan")
+    k = min(len(sorted_values) - 1, max(0, int(round(q / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[k]
+
+
+def _build_urls(base, sessions, drivers, endpoints):
+    urls = []
+    for year, gp, ses in sessions:
+        for endpoint in endpoints:
+            query = {"year": year, "gp": gp, "ses": ses}
+            if endpoint != "/api/session" and drivers:
+                query["drivers"] = ",".join(drivers)
+            urls.append(f"{base}{endpoint}?{urlencode(query)}")
+    return urls
+
+
+def _fetch(url, timeout):
+    t0 = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as resp:
+            resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception as e:
+        status = type(e).__name__
+    return status, time.perf_counter() - t0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent load test for server.py")
+    parser.add_argument("--url", default=f"http://{SERVER_HOST}:{SERVER_PORT}")
+    parser.add_argument("--session", action="append", default=[], help="YEAR:GP:SES (複数指定可)")
+    parser.add_argument("--drivers", default="", help="カンマ区切りのドライバー略称")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="対象エンドポイントのカンマ区切り")
+    parser.add_argument("--clients", type=int, default=16, help="同時に要求するクライアント数")
+    parser.add_argument("--requests", type=int, default=500, help="合計リクエスト数")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="結果 (JSON) を追記するファイル")
+    args = parser.parse_args(argv)
+
+    sessions = []
+    for spec in args.session:
+        year, gp, ses = spec.split(":", 2)
+        sessions.append((int(year), gp, ses))
+    if not sessions:
+        parser.error("--session を 1 つ以上指定してください")
+    drivers = [d for d in args.drivers.split(",") if d]
+    urls = _build_urls(args.url.rstrip("/"), sessions, drivers, [e for e in args.endpoints.split(",") if e])
+
+    # クライアントごとにずらした順序で URL を巡回する（同じ要求が同時に届く状況も含める）
+    cycle = itertools.cycle(urls)
+    lock = threading.Lock()
+    def _next_url():
+        with lock:
+            return next(cycle)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        results = list(pool.map(lambda _: _fetch(_next_url(), args.timeout), range(args.requests)))
+    elapsed = time.perf_counter() - t0
+
+    latencies = sorted(lat for status, lat in results if status == 200)
+    statuses = Counter(str(status) for status, _ in results)
+    summary = {
+        "clients": args.clients,
+        "requests": args.requests,
+        "ok": len(latencies),
+        "statuses": dict(statuses),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(args.requests / elapsed, 1) if elapsed > 0 else None,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 1),
+        "max_ms": round(latencies[-1] * 1000, 1) if latencies else None,
+    }
+    print(f"{summary['requests']} requests / {summary['clients']} clients in {summary['elapsed_s']}s: "
+          f"{summary['throughput_rps']} req/s, p50={summary['p50_ms']}ms p95={summary['p95_ms']}ms "
+          f"statuses={summary['statuses']}")
+    try:
+        with urllib.request.urlopen(f"{args.url.rstrip('/')}/api/stats", timeout=args.timeout) as resp:
+            print(f"server stats: {resp.read().decode('utf-8')}")
+    except Exception:
+        pass
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(summary) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Memory Benchmark: scripted session browsing
+サイドバーでセッションを次々に切り替える操作を GUI なしで再現し、各ステップ後の RSS と
+ピーク RSS・定常状態 RSS を報告します。
+
+例:
+    python benchmarks/memory_browse.py --offline --repeat 12
+    python benchmarks/memory_browse.py --no-compact --keep   # 圧縮・解放なし（従来の挙動）との比較
+    python benchmarks/memory_browse.py --session "2025:Saudi Arabian Grand Prix:Q" --session "2025:Saudi Arabian Grand Prix:R"
+"""
+
+import argparse
+import gc
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import fastf1
+
+from service import CacheManager, CACHE_DIR
+from offline import OfflineIndex
+from analysis import session_cache
+from analysis.compaction import compact_session
+from analysis.session_meta import get_session_meta
+from analysis.stints import get_stint_model
+from analysis.telemetry_store import get_telemetry_store
+
+
+def _rss_mb():
+    """(現在の RSS, ピーク RSS) を MB で返す。"""
+    try:
+        with open("/proc/self/status") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        return int(fields["VmRSS"].split()[0]) / 1024, int(fields["VmHWM"].split()[0]) / 1024
+    except (OSError, KeyError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_mb = peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+        return float("nan"), peak_mb
+
+
+def _load(index, year, gp, ses, offline, compact):
+    if offline:
+        s = index.load_session(year, gp, ses)
+    else:
+        s = fastf1.get_session(year, gp, ses)
+        s.load()
+    if compact:
+        compact_session(s)
+    get_session_meta(s)
+    get_stint_model(s)
+    get_telemetry_store(s)
+    return s
+
+
+def _render_views(session):
+    # 各タブと同程度の図を作る（Tk の代わりに Agg で描画）
+    meta = get_session_meta(session)
+    store = get_telemetry_store(session)
+    figures = []
+    fig = plt.Figure(figsize=(6, 4), dpi=100)
+    ax = fig.add_subplot(111)
+    for drv in meta.abbreviations:
+        lap_number = store.fastest_lap_number(drv)
+        tel = store.lap(drv, lap_number) if lap_number is not None else None
+        if tel is not None:
+            ax.plot(tel['Distance'], tel['Speed'], **meta.driver_style(drv))
+    fig.canvas.draw()
+    figures.append(fig)
+
+    laps = session.laps.pick_quicklaps()
+    fig = plt.Figure(figsize=(7, 5), dpi=100)
+    ax = fig.add_subplot(111)
+    ax.scatter(laps['LapNumber'], laps['LapTime'].dt.total_seconds(), s=5)
+    fig.canvas.draw()
+    figures.append(fig)
+    return figures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scripted browsing memory benchmark")
+    parser.add_argument("--session", action="append", default=[],
+                        help="YEAR:GP:SES (複数指定可)。省略時はオフラインキャッシュ内の全セッション")
+    parser.add_argument("--repeat", type=int, default=12, help="閲覧するセッション数（リストを循環）")
+    parser.add_argument("--offline", action="store_true", help="キャッシュのみから読み込む")
+    parser.add_argument("--no-compact", action="store_true", help="ロード後の軽量化を行わない")
+    parser.add_argument("--keep", action="store_true", help="置き換えたセッションと図を解放しない")
+    parser.add_argument("--output", help="結果を追記するファイル")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.ERROR)
+    CacheManager.ensure_cache_dir(offline=args.offline)
+    fastf1.set_log_level("ERROR")
+    index = OfflineIndex(CACHE_DIR)
+
+    targets = []
+    for spec in args.session:
+        year, gp, ses = spec.split(":", 2)
+        targets.append((int(year), gp, ses))
+    if not targets:
+        targets = [(y, e.name, ses) for y in index.years for e in index.events(y) for ses in e.sessions]
+    if not targets:
+        parser.error("閲覧するセッションがありません (--session を指定してください)")
+
+    rss0, _ = _rss_mb()
+    print(f"baseline RSS: {rss0:.1f} MB")
+    print(f"{'step':>4}  {'session':<45} {'load s':>7} {'RSS MB':>8}")
+
+    current, current_figs, kept = None, [], []
+    samples = []
+    for step in range(args.repeat):
+        year, gp, ses = targets[step % len(targets)]
+        t0 = time.perf_counter()
+        session = _load(index, year, gp, ses, args.offline, not args.no_compact)
+        figs = _render_views(session)
+        elapsed = time.perf_counter() - t0
+
+        if current is not None:
+            if args.keep:
+                kept.append((current, current_figs))
+            else:
+                # サイドバーの _release_current_session と同じ手順
+                session_cache.release(current)
+                for fig in current_figs:
+                    fig.clear()
+        current, current_figs = session, figs
+        del session, figs
+        gc.collect()
+
+        rss, _ = _rss_mb()
+        samples.append(rss)
+        print(f"{step + 1:>4}  {f'{year} {gp} {ses}':<45} {elapsed:>7.2f} {rss:>8.1f}")
+
+    _, peak = _rss_mb()
+    tail = samples[len(samples) // 2:]
+    steady = sum(tail) / len(tail)
+    summary = (f"compact={not args.no_compact} release={not args.keep} steps={args.repeat} "
+               f"peak_rss={peak:.1f}MB steady_rss={steady:.1f}MB growth={samples[-1] - samples[0]:+.1f}MB")
+    print(summary)
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(summary + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Stand-in check: cache warm-up
+warmup.WarmupRunner をネットワークなしのローカルなデータソースに対して実行し、取得ループの動作を確認します。
+取得は一時ディレクトリに指定サイズのファイルを書くだけなので、数秒で終わります。
+
+確認する内容:
+- 同時実行数が --concurrency を超えないこと
+- 取得中のセッション分を見込んで、キャッシュサイズが上限を超える前に新しい取得を止めること
+- 中断（上限到達）後に再実行すると、完了済みのセッションを取得し直さずに続きから再開すること
+- 存在しないセッション種別はスキップ、それ以外の ValueError は失敗として記録されること
+
+例:
+    python benchmarks/warmup_standin.py --concurrency 3 --session-mb 2
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from warmup import Checkpoint, WarmupRunner, SIZE_LIMIT_EXIT_CODE
+
+EVENTS = ["Bahrain Grand Prix", "Miami Grand Prix", "Monaco Grand Prix", "British Grand Prix"]
+SPRINT_EVENTS = {"Miami Grand Prix"}  # FP2 が存在しない
+BROKEN = ("Monaco Grand Prix", "Q")   # 存在しないセッション以外の ValueError を出す
+
+
+class _Task:
+    def __init__(self, future):
+        self.future = future
+
+
+class LocalSource:
+    """ServiceSource と同じインターフェースで、セッションの代わりにダミーファイルをキャッシュに書く。"""
+
+    def __init__(self, cache_dir: Path, session_bytes, delay=0.05):
+        self.cache_dir = cache_dir
+        self.session_bytes = session_bytes
+        self.delay = delay
+        self.pool = ThreadPoolExecutor(max_workers=8)
+        self.fetched = Counter()
+        self.active = self.max_active = 0
+        self._lock = threading.Lock()
+
+    def events(self, year):
+        return list(EVENTS)
+
+    def fetch_async(self, year, gp, ses, token):
+        return _Task(self.pool.submit(self._fetch, year, gp, ses, token))
+
+    def _fetch(self, year, gp, ses, token):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.fetched[(year, gp, ses)] += 1
+        try:
+            token.raise_if_cancelled()
+            if ses == "FP2" and gp in SPRINT_EVENTS:
+                raise ValueError(f"Session type '{ses}' does not exist for this event")
+            if (gp, ses) == BROKEN:
+                raise ValueError("Failed to parse timing data")
+            # 書き込みは少しずつ進める（取得中もキャッシュが増えていく状況を再現する）
+            path = self.cache_dir / str(year) / gp / f"{ses}.ff1pkl"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            chunk = b"\0" * (self.session_bytes // 4)
+            with open(path, "wb") as f:
+                for _ in range(4):
+                    time.sleep(self.delay / 4)
+                    f.write(chunk)
+            return 1
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def _cache_size(cache_dir):
+    return lambda: sum(p.stat().st_size for p in cache_dir.rglob("*") if p.is_file())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the warm-up loop against a local stand-in data source.")
+    parser.add_argument("--concurrency", type=int, default=3)
+    parser.add_argument("--session-mb", type=float, default=1.0, help="1 セッションあたりのダミーデータの大きさ (MB)")
+    parser.add_argument("--sessions", default="FP1,FP2,Q,R")
+    args = parser.parse_args(argv)
+
+    session_bytes = int(args.session_mb * 1024**2)
+    sessions = args.sessions.split(",")
+    years = [2024, 2025]
+    total = len(years) * len(EVENTS) * len(sessions)
+    failures = []
+
+    def check(cond, message):
+        print(f"{'ok  ' if cond else 'FAIL'} {message}")
+        if not cond:
+            failures.append(message)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = Path(tmp)
+        checkpoint_path = cache_dir / "warmup_checkpoint.json"
+        source = LocalSource(cache_dir, session_bytes)
+
+        # 1 回目: 全体の半分程度しか入らない上限で実行する
+        limit = session_bytes * total // 2
+        runner = WarmupRunner(source, Checkpoint(checkpoint_path), _cache_size(cache_dir), limit,
+                              concurrency=args.concurrency, session_bytes=session_bytes)
+        code = runner.run(years, sessions)
+        size = _cache_size(cache_dir)()
+        first = Checkpoint(checkpoint_path)
+        check(code == SIZE_LIMIT_EXIT_CODE, f"stops at the size limit (exit code {code})")
+        check(size <= limit, f"cache stays under the limit ({size / 1024**2:.1f}MB <= {limit / 1024**2:.1f}MB)")
+        check(source.max_active <= args.concurrency,
+              f"at most {args.concurrency} fetches in flight (max {source.max_active})")
+
+        # 2 回目: 上限を外して再開する
+        runner = WarmupRunner(source, Checkpoint(checkpoint_path), _cache_size(cache_dir), session_bytes * total * 2,
+                              concurrency=args.concurrency, session_bytes=session_bytes)
+        code = runner.run(years, sessions)
+        done = Checkpoint(checkpoint_path)
+        refetched = [job for job, n in source.fetched.items()
+                     if n > 1 and Checkpoint.key(*job) in first.done | first.skipped]
+        check(code == 0, f"resumed run completes (exit code {code})")
+        check(not refetched, f"finished sessions are not fetched again ({len(refetched)} refetched)")
+        expected_skipped = {Checkpoint.key(y, gp, "FP2") for y in years for gp in SPRINT_EVENTS} if "FP2" in sessions else set()
+        expected_failed = {Checkpoint.key(y, *BROKEN) for y in years} if BROKEN[1] in sessions else set()
+        check(done.skipped == expected_skipped, f"missing session types are skipped ({len(done.skipped)})")
+        check(set(done.failed) == expected_failed, f"other errors are recorded as failures ({len(done.failed)})")
+        check(len(done.done) == total - len(expected_skipped) - len(expected_failed),
+              f"all other sessions are cached ({len(done.done)}/{total})")
+        source.pool.shutdown()
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,328 @@
+"""
+Cache Storage Module
+FastF1 のキャッシュファイル（.ff1pkl）を圧縮・重複排除して保存するストレージ層です。
+
+各 .ff1pkl は小さな「ポインタ」pickle になり、本体は `<CACHE_DIR>/.objects/` 以下に
+内容の SHA-256 をキーとして圧縮保存されます（同一内容は一度だけ保存）。
+ポインタを unpickle すると本体が展開されて元の dict が返るため、FastF1 側の読み込み処理
+（`pickle.load(open(path, 'rb'))`）は変更なしでそのまま動作します。
+
+ただしポインタの展開にはこのモジュールが必要なため、圧縮後のキャッシュはこのアプリ専用になります
+（同じディレクトリを素の fastf1 スクリプトやノートブックから読むと unpickle に失敗します）。
+既存キャッシュの変換（--migrate）は元に戻せないため、起動時には行わず明示的に実行したときだけ行います。
+
+使い方:
+    python cache_storage.py --migrate   # 既存の生 pickle を圧縮形式に変換（元に戻せません）
+    python cache_storage.py --stats     # 圧縮率・重複排除率・読み込み時間を表示
+    python cache_storage.py --gc        # どこからも参照されない本体を削除
+"""
+
+import argparse
+import hashlib
+import logging
+import lzma
+import os
+import pickle
+import threading
+import time
+import uuid
+import zlib
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:  # 無ければ標準ライブラリの zlib を使う（lzma は展開が遅く読み込み時間の大半を占めるため）
+    zstandard = None
+
+OBJECTS_DIRNAME = ".objects"
+CODEC_EXT = {"zstd": ".zst", "zlib": ".zz", "lzma": ".xz", "none": ".raw"}
+
+_storage = None  # install() で設定される現在のストレージ
+
+
+def _compress(codec, raw: bytes) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(raw)
+    if codec == "zlib":
+        return zlib.compress(raw, 6)
+    if codec == "lzma":
+        return lzma.compress(raw, preset=6)
+    return raw
+
+
+def _decompress(codec, blob: bytes) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(blob)
+    if codec == "zlib":
+        return zlib.decompress(blob)
+    if codec == "lzma":
+        return lzma.decompress(blob)
+    return blob
+
+
+def resolve_codec(name):
+    if name in (None, "none"):
+        return "none"
+    if name == "auto":
+        return "zstd" if zstandard is not None else "zlib"
+    if name == "zstd" and zstandard is None:
+        logging.warning("zstandard is not installed; falling back to zlib cache compression")
+        return "zlib"
+    return name
+
+
+def _load_object(digest, codec, raw_size):
+    # ポインタ pickle から呼ばれる。ストレージ未設定時はファイル位置が分からないため例外にする
+    # （FastF1 は読み込み失敗としてデータを再取得する）
+    if _storage is None:
+        raise RuntimeError("cache storage is not installed")
+    return _storage.read_object(digest, codec, raw_size)
+
+
+class _Pointer:
+    def __init__(self, digest, codec, raw_size):
+        self.digest = digest
+        self.codec = codec
+        self.raw_size = raw_size
+
+    def __reduce__(self):
+        return (_load_object, (self.digest, self.codec, self.raw_size))
+
+
+class _PointerReader(pickle.Unpickler):
+    """本体を展開せずにポインタの中身（digest 等）だけを読み出す。"""
+
+    def find_class(self, module, name):
+        if module == __name__ and name == "_load_object":
+            return lambda digest, codec, raw_size: (digest, codec, raw_size)
+        raise pickle.UnpicklingError("not a cache pointer")
+
+
+def read_pointer(path: Path):
+    """ポインタファイルなら (digest, codec, raw_size) を、生の pickle なら None を返す。"""
+    try:
+        if path.stat().st_size > 1024: # ポインタは数百バイト以下
+            return None
+        with open(path, "rb") as f:
+            return _PointerReader(f).load()
+    except (pickle.UnpicklingError, EOFError, OSError, AttributeError, ValueError, TypeError):
+        return None
+
+
+class CacheStorage:
+    def __init__(self, cache_dir: Path, codec="auto"):
+        self.cache_dir = Path(cache_dir)
+        self.objects_dir = self.cache_dir / OBJECTS_DIRNAME
+        self.codec = resolve_codec(codec)
+        self._lock = threading.Lock()
+        self._reads = 0
+        self._read_raw_bytes = 0
+        self._decompress_seconds = 0.0
+        self._unpickle_seconds = 0.0
+
+    def _object_path(self, digest, codec):
+        return self.objects_dir / digest[:2] / (digest + CODEC_EXT[codec])
+
+    def object_size(self, digest, codec):
+        try:
+            return self._object_path(digest, codec).stat().st_size
+        except (FileNotFoundError, KeyError):
+            return 0
+
+    @staticmethod
+    def _atomic_write(path: Path, data: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    # --- write / read ---
+    def write(self, obj, cache_file_path):
+        raw = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+        self.write_raw(raw, Path(cache_file_path))
+
+    def write_raw(self, raw: bytes, cache_file_path: Path):
+        digest = hashlib.sha256(raw).hexdigest()
+        obj_path = self._object_path(digest, self.codec)
+        if not obj_path.exists(): # 同一内容が既にあれば圧縮・書き込みを省略（重複排除）
+            self._atomic_write(obj_path, _compress(self.codec, raw))
+        pointer = pickle.dumps(_Pointer(digest, self.codec, len(raw)), protocol=pickle.HIGHEST_PROTOCOL)
+        self._atomic_write(cache_file_path, pointer)
+
+    def read_object(self, digest, codec, raw_size):
+        t0 = time.perf_counter()
+        blob = self._object_path(digest, codec).read_bytes()
+        raw = _decompress(codec, blob)
+        t1 = time.perf_counter()
+        obj = pickle.loads(raw)
+        t2 = time.perf_counter()
+        with self._lock:
+            self._reads += 1
+            self._read_raw_bytes += len(raw)
+            self._decompress_seconds += t1 - t0
+            self._unpickle_seconds += t2 - t1
+        return obj
+
+    # --- maintenance ---
+    def _pickle_files(self):
+        for path in self.cache_dir.rglob("*.ff1pkl"):
+            if OBJECTS_DIRNAME not in path.parts:
+                yield path
+
+    def migrate(self):
+        """既存の生 pickle をポインタ + 圧縮本体に置き換える。戻り値は変換したファイル数。"""
+        converted = 0
+        for path in self._pickle_files():
+            if read_pointer(path) is not None:
+                continue
+            try:
+                raw = path.read_bytes()
+                pickle.loads(raw) # 壊れたファイルは変換しない（FastF1 に再取得させる）
+            except Exception as e:
+                logging.warning(f"Skipping unreadable cache file {path}: {e}")
+                continue
+            self.write_raw(raw, path)
+            converted += 1
+        return converted
+
+    def gc_objects(self, grace_seconds=600):
+        """どのポインタからも参照されていない本体を削除する。戻り値は削除数。
+        書き込み途中（本体は書いたがポインタがまだ無い）のものを消さないよう、新しいファイルは残す。"""
+        referenced = set()
+        for path in self._pickle_files():
+            pointer = read_pointer(path)
+            if pointer is not None:
+                referenced.add(pointer[0])
+        removed = 0
+        cutoff = time.time() - grace_seconds
+        if self.objects_dir.exists():
+            for obj in self.objects_dir.rglob("*"):
+                if obj.is_file() and obj.name.split(".")[0] not in referenced:
+                    try:
+                        if obj.stat().st_mtime > cutoff:
+                            continue
+                        obj.unlink()
+                        removed += 1
+                    except FileNotFoundError:
+                        pass
+        return removed
+
+    def stats(self):
+        pointers = raw_pickles = 0
+        logical_bytes = 0          # 各ポインタが指す元データの合計（重複込み）
+        raw_pickle_bytes = 0
+        unique = {}
+        for path in self._pickle_files():
+            pointer = read_pointer(path)
+            if pointer is None:
+                raw_pickles += 1
+                raw_pickle_bytes += path.stat().st_size
+                continue
+            digest, codec, raw_size = pointer
+            pointers += 1
+            logical_bytes += raw_size
+            unique[(digest, codec)] = raw_size
+        unique_raw_bytes = sum(unique.values())
+        stored_bytes = 0
+        for (digest, codec) in unique:
+            try:
+                stored_bytes += self._object_path(digest, codec).stat().st_size
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            reads = self._reads
+            read_raw = self._read_raw_bytes
+            dec_s, unp_s = self._decompress_seconds, self._unpickle_seconds
+        return {
+            "codec": self.codec,
+            "entries": pointers,
+            "unconverted_entries": raw_pickles,
+            "unique_objects": len(unique),
+            "logical_bytes": logical_bytes,
+            "stored_bytes": stored_bytes,
+            "unconverted_bytes": raw_pickle_bytes,
+            "compression_ratio": unique_raw_bytes / stored_bytes if stored_bytes else None,
+            "dedup_ratio": logical_bytes / unique_raw_bytes if unique_raw_bytes else None,
+            "overall_ratio": logical_bytes / stored_bytes if stored_bytes else None,
+            "reads": reads,
+            "avg_decompress_ms": dec_s / reads * 1000 if reads else None,
+            "avg_unpickle_ms": unp_s / reads * 1000 if reads else None,
+            # 展開にかかる時間が、読み込み全体（展開 + unpickle）に占める割合
+            "decompress_share": dec_s / (dec_s + unp_s) if reads and (dec_s + unp_s) > 0 else None,
+            "decompress_mb_per_s": read_raw / 1024**2 / dec_s if dec_s > 0 else None,
+        }
+
+    def benchmark_reads(self, limit=50):
+        """圧縮本体を実際に読み込み、展開時間と unpickle 時間を計測して stats に反映する。"""
+        seen = set()
+        for path in self._pickle_files():
+            pointer = read_pointer(path)
+            if pointer is None or pointer[0] in seen:
+                continue
+            seen.add(pointer[0])
+            self.read_object(*pointer)
+            if len(seen) >= limit:
+                break
+
+
+def install(cache_dir, codec="auto") -> CacheStorage:
+    """FastF1 のキャッシュ書き込みを CacheStorage 経由に差し替える。"""
+    global _storage
+    import fastf1
+
+    _storage = CacheStorage(cache_dir, codec)
+    if _storage.codec == "none":
+        return _storage
+
+    def _write_cache(cls, data, cache_file_path, **kwargs):
+        # fastf1.req.Cache._write_cache と同じ dict 構造で保存する
+        new_cached = dict(**{'version': cls._API_CORE_VERSION, 'data': data}, **kwargs)
+        _storage.write(new_cached, cache_file_path)
+
+    fastf1.Cache._write_cache = classmethod(_write_cache)
+    return _storage
+
+
+def get_storage():
+    return _storage
+
+
+def format_stats(stats) -> str:
+    def _fmt(v, spec):
+        return "n/a" if v is None else format(v, spec)
+    return (f"codec={stats['codec']} entries={stats['entries']} unique={stats['unique_objects']} "
+            f"unconverted={stats['unconverted_entries']} "
+            f"logical={stats['logical_bytes'] / 1024**2:.1f}MB stored={stats['stored_bytes'] / 1024**2:.1f}MB "
+            f"compression={_fmt(stats['compression_ratio'], '.2f')}x dedup={_fmt(stats['dedup_ratio'], '.2f')}x "
+            f"overall={_fmt(stats['overall_ratio'], '.2f')}x "
+            f"reads={stats['reads']} decompress={_fmt(stats['avg_decompress_ms'], '.2f')}ms/read "
+            f"({_fmt(stats['decompress_mb_per_s'], '.0f')}MB/s, "
+            f"{_fmt(stats['decompress_share'] * 100 if stats['decompress_share'] is not None else None, '.0f')}% of read time)")
+
+
+def main(argv=None):
+    from config import CACHE_DIR, CACHE_COMPRESSION
+
+    parser = argparse.ArgumentParser(description="Compressed FastF1 cache maintenance")
+    parser.add_argument("--migrate", action="store_true", help="既存の生 pickle を圧縮形式に変換する")
+    parser.add_argument("--gc", action="store_true", help="参照されていない本体を削除する")
+    parser.add_argument("--stats", action="store_true", help="圧縮率と読み込み時間を表示する")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO,
+                        format="[%(asctime)s] %(levelname)s %(filename)s:%(lineno)d %(message)s")
+    storage = CacheStorage(Path(CACHE_DIR), CACHE_COMPRESSION)
+    if args.migrate:
+        logging.info(f"Converted {storage.migrate()} cache files")
+    if args.gc:
+        logging.info(f"Removed {storage.gc_objects()} unreferenced objects")
+    if args.stats or not (args.migrate or args.gc):
+        storage.benchmark_reads()
+        print(format_stats(storage.stats()))
+
+
+if __name__ == "__main__":
+    # ポインタが "__main__" ではなく "cache_storage" モジュールを参照するよう、モジュールとして読み込み直して実行する
+    import cache_storage
+    cache_storage.main()
@@ -25,6 +25,37 @@ MPL_STYLE = 'fastf1'
 CACHE_DIR = "_fastf1_cache"
 CACHE_SIZE_LIMIT_GB = 2
 CACHE_EXPIRE_DAYS = 30
+CACHE_COMPRESSION = "auto"  # キャッシュ本体の圧縮方式: "auto" (zstandard があれば zstd、無ければ zlib) / "zstd" / "zlib" / "lzma" / "none"
+CACHE_MIGRATE_ON_STARTUP = False  # True にすると起動時に既存の生 pickle も圧縮形式に変換する（元に戻せません）
+OFFLINE_MODE = False  # True にすると起動時からキャッシュ済みデータのみを使用し、ネットワークにはアクセスしません
+
+# --- Analysis ---
+FUEL_CORRECTION_S_PER_LAP = 0.03  # 燃料1周分の軽量化によるラップタイム短縮量（秒）
+MIN_STINT_LAPS = 3                # デグラデーションを推定するスティントの最小周回数
+
+# --- Session Comparison ---
+MAX_PINNED_SESSIONS = 4           # 比較用に同時に保持するセッションの最大数
+SESSION_MEMORY_BUDGET_MB = 1536   # 比較用セッション全体で使用するメモリの上限（推定値、MB）
+
+# --- Export (exporter.py, requires pyarrow) ---
+EXPORT_FORMAT = "parquet"         # "parquet" または "arrow" (Arrow IPC)
+EXPORT_ROW_GROUP_ROWS = 100_000   # 1 回に変換・書き込みする行数（Parquet の行グループの大きさ）
+
+# --- Server Mode (server.py) ---
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8050
+SERVER_MAX_SESSIONS = 6        # プロセス内で共有するロード済みセッションの最大数
+SERVER_MAX_RENDERS = 4         # 図の同時描画数の上限
+SERVER_RENDER_TIMEOUT_S = 10   # 描画の空きを待つ最大秒数（超えると 503）
+SERVER_RESPONSE_CACHE = 256    # 応答（JSON / PNG）をキャッシュする件数
+
+# --- Stall Watchdog (stall_watchdog.py) ---
+WATCHDOG_ENABLED = True
+WATCHDOG_INTERVAL_MS = 100     # メインスレッドのハートビート間隔
+WATCHDOG_STALL_MS = 250        # ハートビートがこれ以上遅れたら「停止」として記録する
+WATCHDOG_SAMPLE_MS = 5         # 停止中にメインスレッドのスタックを採取する間隔
+WATCHDOG_MAX_RECORDS = 200     # レポートに保持する直近の停止記録数
+WATCHDOG_REPORT_PATH = "stall_report.json"
 
 # --- Logging ---
 LOG_LEVEL = "INFO"
\ No newline at end of file
@@ -0,0 +1,136 @@
+"""
+Session Export Module
+ロード済みセッションのラップ・天候・ドライバーごとのテレメトリ（car data / position data）を
+Parquet または Arrow IPC ファイルに書き出します。
+データフレームは EXPORT_ROW_GROUP_ROWS 行ずつの塊に分けて順に書き込むため（Parquet では 1 塊 = 1 行グループ）、
+全ドライバー分を結合した巨大なデータフレームをメモリ上に作ることはありません。
+
+pyarrow は任意依存です（`pip install pyarrow`）。未インストールの場合、書き出し時に ImportError になります。
+
+例（ノートブックなどから）:
+    from exporter import export_session
+    export_session(session, "exports", fmt="parquet")
+"""
+
+import logging
+import re
+from pathlib import Path
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:  # 任意依存: 書き出し機能を使うときだけ必要
+    pa = None
+
+from config import EXPORT_ROW_GROUP_ROWS
+from scheduler import report_progress, checkpoint
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("データの書き出しには pyarrow が必要です (pip install pyarrow)")
+
+
+def session_dirname(session) -> str:
+    name = f"{session.event.year}_{session.event['EventName']}_{session.name}"
+    return re.sub(r"[^0-9A-Za-z_-]+", "_", name).strip("_")
+
+
+class _TableWriter:
+    """最初の塊のスキーマでファイルを開き、以降の塊を同じスキーマで追記する。"""
+
+    def __init__(self, path: Path, fmt: str):
+        self.path = path
+        self.fmt = fmt
+        self.schema = None
+        self.rows = 0
+        self._writer = None
+
+    def write(self, df: pd.DataFrame):
+        if df.empty:
+            return
+        table = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+        if self._writer is None:
+            self.schema = table.schema
+            if self.fmt == "parquet":
+                self._writer = pq.ParquetWriter(self.path, self.schema, compression="zstd")
+            else:
+                self._writer = pa.ipc.new_file(str(self.path), self.schema)
+        self._writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        return self.rows > 0
+
+
+def _chunks(df: pd.DataFrame, rows: int):
+    for start in range(0, len(df), rows):
+        yield pd.DataFrame(df.iloc[start:start + rows])
+
+
+def _write_frames(path: Path, fmt: str, frames, rows: int) -> bool:
+    """`frames`（DataFrame のイテラブル）を塊ごとに 1 ファイルへ書き出す。書いた行があれば True。"""
+    writer = _TableWriter(path, fmt)
+    try:
+        for df in frames:
+            for chunk in _chunks(df, rows):
+                checkpoint()
+                writer.write(chunk)
+    except BaseException:
+        writer.close()
+        path.unlink(missing_ok=True) # 中断・失敗した書きかけのファイルは残さない
+        raise
+    if not writer.close():
+        path.unlink(missing_ok=True)
+        return False
+    return True
+
+
+def _driver_telemetry(session, attr):
+    """(DriverNumber, Driver) 列を付けたドライバーごとのテレメトリを 1 人ずつ返す。"""
+    data = getattr(session, attr, None) or {}  # 未ロード時にプロパティが例外を出すため内部属性を参照する
+    laps = getattr(session, '_laps', None)
+    abbreviations = {}
+    if laps is not None and len(laps) > 0:
+        abbreviations = laps.drop_duplicates('DriverNumber').set_index('DriverNumber')['Driver'].astype(str).to_dict()
+    for number, tel in data.items():
+        if tel is None or tel.empty:
+            continue
+        df = pd.DataFrame(tel, copy=False)
+        # 軽量化でドライバーごとに整数幅が異なる場合があるため、ファイル全体で同じ型に揃える
+        widths = {c: 'int32' for c in df.columns if pd.api.types.is_integer_dtype(df[c].dtype)}
+        widths.update({c: 'float32' for c in df.columns if pd.api.types.is_float_dtype(df[c].dtype)})
+        yield df.astype(widths).assign(DriverNumber=str(number), Driver=abbreviations.get(str(number), str(number)))
+
+
+def export_session(session, out_dir, fmt="parquet", telemetry=True, rows=EXPORT_ROW_GROUP_ROWS):
+    """セッションを `out_dir/<年_イベント_セッション>/` 以下に書き出し、作成したファイルのリストを返す。"""
+    _require_pyarrow()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt} (choose from {', '.join(FORMATS)})")
+    target = Path(out_dir) / session_dirname(session)
+    target.mkdir(parents=True, exist_ok=True)
+    ext = FORMATS[fmt]
+
+    parts = [("laps", lambda: [pd.DataFrame(session.laps)]),
+             ("weather", lambda: [getattr(session, '_weather_data', None)])]
+    if telemetry:
+        parts += [("car_data", lambda: _driver_telemetry(session, '_car_data')),
+                  ("position_data", lambda: _driver_telemetry(session, '_pos_data'))]
+
+    written = []
+    for i, (name, frames) in enumerate(parts):
+        report_progress(name, int(i / len(parts) * 100))
+        path = target / f"{name}{ext}"
+        if _write_frames(path, fmt, (df for df in frames() if df is not None), rows):
+            written.append(path)
+    report_progress("done", 100)
+    logging.info(f"Exported {session_dirname(session)} to {target} ({len(written)} files)")
+    return written
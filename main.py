@@ -2,10 +2,11 @@ import sys
 import logging
 import tkinter as tk
 from tkinter import ttk
-from config import APP_TITLE, WINDOW_SIZE, COLOR_BG, COLOR_FRAME, COLOR_TEXT, COLOR_ACCENT, MPL_STYLE
-from service import FastF1Service, CacheManager
+from config import APP_TITLE, WINDOW_SIZE, COLOR_BG, COLOR_FRAME, COLOR_TEXT, COLOR_ACCENT, MPL_STYLE, WATCHDOG_ENABLED
+from service import FastF1Service, SCHEDULER
 from ui.main_tab import MainTab
 from ui.sidebar import Sidebar
+from stall_watchdog import StallWatchdog
 import fastf1.plotting
 
 class F1DashboardApp(tk.Tk):
@@ -23,8 +24,12 @@ class F1DashboardApp(tk.Tk):
             except Exception as e:
                 logging.warning(f"Could not apply Matplotlib style '{MPL_STYLE}': {e}")
 
+        SCHEDULER.attach_tk(self) # ワーカーからのコールバックはこの after ポンプ経由で Tk スレッドに届く
+        self.watchdog = StallWatchdog(self) if WATCHDOG_ENABLED else None # 操作後の固まりを計測・記録する
+        if self.watchdog is not None:
+            self.watchdog.start()
         self.service = FastF1Service()
-        CacheManager.cleanup_cache()
+        self.service.cleanup_cache_async()
 
         self.paned_window = ttk.PanedWindow(self, orient=tk.HORIZONTAL)
         self.paned_window.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
@@ -0,0 +1,150 @@
+"""
+Offline Provider Module
+`_fastf1_cache` 内にキャッシュ済みのシーズン・イベント・セッションを走査して完全性インデックスを作り、
+ネットワークに一切アクセスせずにスケジュールとセッションをローカルファイルのみから提供します。
+"""
+
+import logging
+from pathlib import Path
+import pandas as pd
+from fastf1.core import Session
+from fastf1.events import EventSchedule
+
+# session.load() (laps) に最低限必要なキャッシュファイル
+CORE_FILES = {'session_info', 'driver_info', 'session_status_data', 'track_status_data',
+              '_extended_timing_data', 'timing_app_data'}
+TELEMETRY_FILES = {'car_data', 'position_data'}
+
+SESSION_ABBREVIATIONS = {
+    'Practice 1': 'FP1', 'Practice 2': 'FP2', 'Practice 3': 'FP3',
+    'Qualifying': 'Q', 'Race': 'R',
+    'Sprint': 'S', 'Sprint Qualifying': 'SQ', 'Sprint Shootout': 'SS',
+}
+
+
+class CachedSession:
+    def __init__(self, name, date, path, files):
+        self.name = name                 # 'Qualifying' など FastF1 のセッション名
+        self.abbreviation = SESSION_ABBREVIATIONS.get(name, name)
+        self.date = date
+        self.path = path
+        self.files = files
+
+    @property
+    def is_complete(self):
+        return CORE_FILES.issubset(self.files)
+
+    @property
+    def has_telemetry(self):
+        return TELEMETRY_FILES.issubset(self.files)
+
+    @property
+    def has_weather(self):
+        return 'weather_data' in self.files
+
+    @property
+    def has_messages(self):
+        return 'race_control_messages' in self.files
+
+
+class CachedEvent:
+    def __init__(self, year, name, date, path):
+        self.year = year
+        self.name = name
+        self.date = date
+        self.path = path
+        self.sessions = {}  # 略称 -> CachedSession
+
+
+def _split_dated_name(dirname):
+    # "2025-04-20_Saudi_Arabian_Grand_Prix" -> (Timestamp, "Saudi Arabian Grand Prix")
+    date_str, _, name = dirname.partition('_')
+    try:
+        date = pd.Timestamp(date_str)
+    except (ValueError, TypeError):
+        return None, None
+    return date, name.replace('_', ' ')
+
+
+class OfflineIndex:
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+        self._events = {}  # year -> {EventName: CachedEvent}
+        self.refresh()
+
+    def refresh(self):
+        events = {}
+        if self.cache_dir.exists():
+            for year_dir in self.cache_dir.iterdir():
+                if not (year_dir.is_dir() and year_dir.name.isdigit()):
+                    continue
+                year = int(year_dir.name)
+                for event_dir in year_dir.iterdir():
+                    if not event_dir.is_dir():
+                        continue
+                    date, name = _split_dated_name(event_dir.name)
+                    if name is None:
+                        continue
+                    event = CachedEvent(year, name, date, event_dir)
+                    for ses_dir in event_dir.iterdir():
+                        if not ses_dir.is_dir():
+                            continue
+                        ses_date, ses_name = _split_dated_name(ses_dir.name)
+                        if ses_name is None:
+                            continue
+                        files = {f.stem for f in ses_dir.iterdir() if f.suffix == '.ff1pkl'}
+                        ses = CachedSession(ses_name, ses_date, ses_dir, files)
+                        if ses.is_complete:
+                            event.sessions[ses.abbreviation] = ses
+                    if event.sessions:
+                        events.setdefault(year, {})[name] = event
+        self._events = events
+        logging.info(f"Offline index: {sum(len(v) for v in events.values())} events in {len(events)} seasons")
+
+    @property
+    def years(self):
+        return sorted(self._events)
+
+    def events(self, year):
+        return sorted(self._events.get(year, {}).values(), key=lambda e: e.date)
+
+    def get_event(self, year, gp):
+        return self._events.get(year, {}).get(gp)
+
+    def available_sessions(self, year, gp):
+        event = self.get_event(year, gp)
+        return [] if event is None else list(event.sessions)
+
+    def is_available(self, year, gp, ses):
+        return ses in self.available_sessions(year, gp)
+
+    def event_schedule(self, year) -> EventSchedule:
+        """キャッシュ済みイベントだけからなる EventSchedule を組み立てる。"""
+        rows = []
+        for rnd, event in enumerate(self.events(year), start=1):
+            row = {'RoundNumber': rnd, 'Country': '', 'Location': event.name,
+                   'OfficialEventName': event.name, 'EventDate': event.date,
+                   'EventName': event.name, 'EventFormat': 'conventional', 'F1ApiSupport': True}
+            sessions = sorted(event.sessions.values(), key=lambda s: s.date)[:5]
+            for i in range(1, 6):
+                ses = sessions[i - 1] if i <= len(sessions) else None
+                row[f'Session{i}'] = ses.name if ses else ''
+                row[f'Session{i}Date'] = ses.date if ses else pd.NaT
+                row[f'Session{i}DateUtc'] = ses.date if ses else pd.NaT
+            rows.append(row)
+        return EventSchedule(pd.DataFrame(rows), year=year)
+
+    def get_session(self, year, gp, ses) -> Session:
+        cached = self.get_event(year, gp)
+        if cached is None or ses not in cached.sessions:
+            raise ValueError(f"{year} {gp} {ses} はオフラインキャッシュに存在しません。")
+        schedule = self.event_schedule(year)
+        event = schedule[schedule['EventName'] == gp].iloc[0]
+        return Session(event, cached.sessions[ses].name, f1_api_support=True)
+
+    def load_session(self, year, gp, ses) -> Session:
+        session = self.get_session(year, gp, ses)
+        cached = self.get_event(year, gp).sessions[ses]
+        session.load(telemetry=cached.has_telemetry, weather=cached.has_weather,
+                     messages=cached.has_messages)
+        return session
@@ -0,0 +1,166 @@
+"""
+Task Scheduler Module
+アプリ全体で共有する優先度付きタスクスケジューラです。
+ワーカースレッドは優先度順（ユーザー操作 > 表示用の事前計算 > 先読み > メンテナンス）にタスクを実行し、
+キャンセルトークンと段階的な進捗通知をサポートします。完了・進捗コールバックは単一の Tk `after` ポンプで
+メインスレッドに受け渡されるため、ウィジェット操作はすべて Tk スレッド上で行われます。
+"""
+
+import itertools
+import logging
+import queue
+import threading
+from concurrent.futures import Future, CancelledError
+from enum import IntEnum
+
+
+class Priority(IntEnum):
+    USER_VISIBLE = 0     # ユーザーが結果を待っている操作（スケジュール取得、セッションロード）
+    VIEW_PRECOMPUTE = 1  # 表示に使う集計・索引の事前計算
+    PREFETCH = 2         # 次に使われそうなデータの先読み
+    MAINTENANCE = 3      # キャッシュ整理などの保守作業
+
+
+class TaskCancelled(Exception):
+    pass
+
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise TaskCancelled()
+
+
+class Task:
+    def __init__(self, scheduler, fn, args, kwargs, priority, token, name,
+                 on_done=None, on_error=None, on_progress=None):
+        self.scheduler = scheduler
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.token = token or CancelToken()
+        self.name = name or getattr(fn, '__name__', 'task')
+        self.future = Future()
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+
+    def result(self, timeout=None):
+        return self.future.result(timeout)
+
+    def done(self):
+        return self.future.done()
+
+    def cancel(self):
+        self.token.cancel()
+        self.future.cancel() # 未開始なら即座にキャンセル済みになる
+
+    def report(self, stage, percent):
+        if self.on_progress is not None and not self.token.cancelled:
+            self.scheduler.post_to_ui(self.on_progress, stage, percent)
+
+
+_current = threading.local()
+
+
+def current_task():
+    return getattr(_current, 'task', None)
+
+
+def report_progress(stage, percent):
+    """実行中タスクの進捗を通知する（タスク外から呼ばれた場合は何もしない）。"""
+    task = current_task()
+    if task is not None:
+        task.report(stage, percent)
+
+
+def checkpoint():
+    """実行中タスクがキャンセルされていれば TaskCancelled を送出する。"""
+    task = current_task()
+    if task is not None:
+        task.token.raise_if_cancelled()
+
+
+class TaskScheduler:
+    def __init__(self, max_workers=4, thread_name_prefix="Worker"):
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._ui_queue = queue.SimpleQueue()
+        self._ui_widget = None
+        self._workers = []
+        for i in range(max_workers):
+            t = threading.Thread(target=self._worker_loop, name=f"{thread_name_prefix}_{i}", daemon=True)
+            t.start()
+            self._workers.append(t)
+
+    # --- submission ---
+    def submit(self, fn, *args, priority=Priority.USER_VISIBLE, token=None, name=None,
+               on_done=None, on_error=None, on_progress=None, **kwargs):
+        task = Task(self, fn, args, kwargs, priority, token, name, on_done, on_error, on_progress)
+        self._queue.put((int(priority), next(self._seq), task))
+        return task
+
+    def _worker_loop(self):
+        while True:
+            _, _, task = self._queue.get()
+            if task.token.cancelled or not task.future.set_running_or_notify_cancel():
+                if not task.future.done():
+                    task.future.cancel()
+                continue
+
+            _current.task = task
+            try:
+                result = task.fn(*task.args, **task.kwargs)
+                task.token.raise_if_cancelled()
+            except (TaskCancelled, CancelledError):
+                task.future.set_exception(TaskCancelled())
+                logging.debug(f"Task cancelled: {task.name}")
+            except Exception as e:
+                task.future.set_exception(e)
+                if task.on_error is not None:
+                    self.post_to_ui(task.on_error, e)
+                else:
+                    logging.error(f"Task '{task.name}' failed: {e}", exc_info=True)
+            else:
+                task.future.set_result(result)
+                if task.on_done is not None:
+                    self.post_to_ui(task.on_done, result)
+            finally:
+                _current.task = None
+
+    # --- Tk marshalling ---
+    def attach_tk(self, widget, interval_ms=30):
+        """`widget.after` で UI キューを定期的に処理するポンプを開始する。"""
+        self._ui_widget = widget
+
+        def _pump():
+            while True:
+                try:
+                    fn, args = self._ui_queue.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    fn(*args)
+                except Exception:
+                    logging.error("UI callback failed", exc_info=True)
+            widget.after(interval_ms, _pump)
+
+        widget.after(interval_ms, _pump)
+
+    def post_to_ui(self, fn, *args):
+        # Tk が接続されていない場合（CLI など）は呼び出し元スレッドでそのまま実行する
+        if self._ui_widget is None:
+            fn(*args)
+        else:
+            self._ui_queue.put((fn, args))
@@ -0,0 +1,321 @@
+"""
+Dashboard Server Module
+ダッシュボードのデータと図をローカル HTTP API として複数のユーザーに提供するサーバーモードです。
+セッションのロードには FastF1Service を、図の描画には tabs/ の描画関数をそのまま使用します。
+
+- ロード済みセッションはプロセス内で共有し（最大 SERVER_MAX_SESSIONS 件、古いものから解放）、
+  各セッションの集計・索引は analysis.session_cache によって一度だけ計算されます。
+- 同じセッションのロードや同じ図の描画を複数のクライアントが同時に要求した場合、計算は 1 回だけ行い結果を共有します。
+- 描画の同時実行数は SERVER_MAX_RENDERS に制限し、空きが出ない場合は 503 を返します。
+
+例:
+    python server.py --port 8050 --offline
+    curl "http://127.0.0.1:8050/api/session?year=2025&gp=Saudi%20Arabian%20Grand%20Prix&ses=Q"
+    curl -o speed.png "http://127.0.0.1:8050/chart/speed.png?year=2025&gp=...&ses=Q&drivers=VER,PIA"
+
+エンドポイント（year / gp / ses は schedule 以外すべて必須、drivers はカンマ区切り）:
+    GET /api/schedule?year=
+    GET /api/session?year=&gp=&ses=              ドライバー一覧と配色
+    GET /api/laptimes?...&drivers=               クイックラップのラップタイム
+    GET /api/speed?...&drivers=&lap=             最速（または指定）ラップの距離-速度データ
+    GET /chart/laptimes.png?...&drivers=
+    GET /chart/speed.png?...&drivers=&lap=
+    GET /api/stats                               キャッシュ・重複排除・待ち状況
+"""
+
+import argparse
+import io
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from config import (COLOR_FRAME, SERVER_HOST, SERVER_PORT, SERVER_MAX_SESSIONS, SERVER_MAX_RENDERS,
+                    SERVER_RENDER_TIMEOUT_S, SERVER_RESPONSE_CACHE)
+from analysis import session_cache
+from analysis.session_meta import get_session_meta
+from analysis.session_summary import get_session_summary
+from tabs.compare_tab import draw_compare
+from tabs.speed_tab import draw_speed_compare, speed_traces, FASTEST_LABEL
+
+
+_LAP_ENDPOINTS = ("/api/speed", "/chart/speed.png")
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Deduplicator:
+    """同じキーの処理が実行中なら新たに実行せず、その結果を待って共有する。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.shared = 0
+
+    def run(self, key, fn):
+        with self._lock:
+            fut = self._inflight.get(key)
+            owner = fut is None
+            if owner:
+                fut = self._inflight[key] = Future()
+            else:
+                self.shared += 1
+        if not owner:
+            return fut.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+
+class LRUCache:
+    def __init__(self, capacity, on_evict=None):
+        self.capacity = capacity
+        self.on_evict = on_evict
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        evicted = []
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.capacity:
+                evicted.append(self._data.popitem(last=False))
+        if self.on_evict is not None:
+            for item in evicted:
+                self.on_evict(*item)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DashboardBackend:
+    """HTTP に依存しない処理部分。セッションの共有キャッシュ・重複排除・描画の同時実行制限を持つ。"""
+
+    def __init__(self, svc, max_sessions=SERVER_MAX_SESSIONS, max_renders=SERVER_MAX_RENDERS,
+                 response_cache=SERVER_RESPONSE_CACHE):
+        self.svc = svc
+        self.sessions = LRUCache(max_sessions, on_evict=lambda key, s: session_cache.release(s))
+        self.responses = LRUCache(response_cache)
+        self.dedup = Deduplicator()
+        self._render_slots = threading.BoundedSemaphore(max_renders)
+        self._schedules = {}
+
+    # --- sessions ---
+    def get_session(self, year, gp, ses):
+        key = (year, gp, ses)
+        session = self.sessions.get(key)
+        if session is not None:
+            return session
+
+        def _load():
+            if self.svc.offline and not self.svc.offline_index.is_available(year, gp, ses):
+                raise HTTPError(404, f"{year} {gp} {ses} is not in the offline cache")
+            s = self.svc.load_session_async(year, gp, ses).result()
+            self.sessions.put(key, s)
+            return s
+        return self.dedup.run(("session",) + key, _load)
+
+    def get_schedule(self, year):
+        def _load():
+            df = self.svc.get_event_schedule_async(year).result()
+            return [{"round": int(r), "name": n, "date": str(d.date())}
+                    for r, n, d in zip(df['RoundNumber'], df['EventName'], df['EventDate'])]
+        if year not in self._schedules:
+            self._schedules[year] = self.dedup.run(("schedule", year), _load)
+        return self._schedules[year]
+
+    # --- JSON ---
+    def session_info(self, session):
+        meta = get_session_meta(session)
+        return {"event": session.event['EventName'], "year": int(session.event.year), "session": session.name,
+                "drivers": [{"abbreviation": d, "team": meta.team(d), **meta.driver_style(d)}
+                            for d in meta.abbreviations]}
+
+    @staticmethod
+    def _laptime_frame(session, drivers):
+        df = get_session_summary(session).lap_times
+        return df[df['Driver'].isin(drivers)] if drivers else df
+
+    def laptimes(self, session, drivers):
+        df = self._laptime_frame(session, drivers)
+        return {d: {"laps": g['LapNumber'].astype(float).tolist(), "lap_time_s": g['LapTime_s'].astype(float).round(3).tolist()}
+                for d, g in df.groupby('Driver', observed=True)}
+
+    def speed(self, session, drivers, lap):
+        return {drv: {"lap": int(n), "distance": tel['Distance'].astype(float).round(1).tolist(),
+                      "speed": tel['Speed'].astype(float).tolist()}
+                for drv, n, tel in speed_traces(session, drivers, lap)}
+
+    # --- charts ---
+    def render(self, kind, session, drivers, lap):
+        if not self._render_slots.acquire(timeout=SERVER_RENDER_TIMEOUT_S):
+            raise HTTPError(503, "too many concurrent renders")
+        try:
+            fig = plt.Figure(figsize=(6,4), dpi=100, facecolor=COLOR_FRAME)
+            ax = fig.add_subplot(111)
+            if kind == "laptimes":
+                df = self._laptime_frame(session, drivers)
+                if df.empty:
+                    raise HTTPError(404, "no quick laps for the selected drivers")
+                draw_compare(fig, ax, session, df, drivers or sorted(df['Driver'].unique()))
+            else:
+                if not drivers:
+                    raise HTTPError(400, "drivers is required")
+                if not draw_speed_compare(fig, ax, session, drivers, lap):
+                    raise HTTPError(404, "no telemetry for the selected drivers")
+            buf = io.BytesIO()
+            FigureCanvasAgg(fig).print_png(buf)
+            return buf.getvalue()
+        finally:
+            self._render_slots.release()
+
+    # --- dispatch ---
+    def handle(self, path, params):
+        """(content_type, body) を返す。同じ要求の結果は応答キャッシュと重複排除で共有する。"""
+        if path not in _LAP_ENDPOINTS: # 使わないパラメータで別の応答としてキャッシュしない
+            params = {k: v for k, v in params.items() if k != "lap"}
+        key = (path, tuple(sorted((k, tuple(v)) for k, v in params.items())))
+        cached = self.responses.get(key)
+        if cached is not None:
+            return cached
+        response = self.dedup.run(("response",) + key, lambda: self._handle(path, params))
+        self.responses.put(key, response)
+        return response
+
+    def _handle(self, path, params):
+        def arg(name, cast=str, default=None):
+            values = params.get(name)
+            if not values:
+                if default is not None:
+                    return default
+                raise HTTPError(400, f"missing parameter: {name}")
+            try:
+                return cast(values[0])
+            except ValueError:
+                raise HTTPError(400, f"invalid parameter: {name}")
+
+        if path == "/api/schedule":
+            return _json(self.get_schedule(arg("year", int)))
+
+        if path not in ("/api/session", "/api/laptimes", "/api/speed", "/chart/laptimes.png", "/chart/speed.png"):
+            raise HTTPError(404, f"unknown endpoint: {path}")
+        lap = FASTEST_LABEL
+        if path in _LAP_ENDPOINTS: # lap を使うのは速度のエンドポイントだけ
+            lap = arg("lap", default=FASTEST_LABEL)
+            if lap != FASTEST_LABEL and not lap.isdigit():
+                raise HTTPError(400, "invalid parameter: lap")
+        session = self.get_session(arg("year", int), arg("gp"), arg("ses"))
+        drivers = [d for d in arg("drivers", default="").split(",") if d]
+        if path == "/api/session":
+            return _json(self.session_info(session))
+        if path == "/api/laptimes":
+            return _json(self.laptimes(session, drivers))
+        if path == "/api/speed":
+            return _json(self.speed(session, drivers, lap))
+        kind = path.rsplit("/", 1)[1].split(".")[0]
+        return "image/png", self.render(kind, session, drivers, lap)
+
+    def stats(self):
+        return {"sessions": len(self.sessions), "session_hits": self.sessions.hits,
+                "session_misses": self.sessions.misses, "responses": len(self.responses),
+                "response_hits": self.responses.hits, "deduplicated": self.dedup.shared}
+
+
+def _json(obj):
+    return "application/json", json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+class DashboardRequestHandler(BaseHTTPRequestHandler):
+    backend = None  # make_server で設定する
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        t0 = time.perf_counter()
+        try:
+            if url.path == "/api/stats":
+                content_type, body = _json(self.backend.stats())
+            else:
+                content_type, body = self.backend.handle(url.path, parse_qs(url.query))
+            status = 200
+        except HTTPError as e:
+            status, (content_type, body) = e.status, _json({"error": str(e)})
+        except Exception as e:
+            logging.error(f"Request failed: {self.path}", exc_info=True)
+            status, (content_type, body) = 500, _json({"error": str(e)})
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if status == 503:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(body)
+        logging.debug(f"{status} {url.path} {(time.perf_counter() - t0) * 1000:.1f}ms")
+
+    def log_message(self, format, *args):
+        pass  # アクセスログは do_GET 内で logging に出す
+
+
+def make_server(svc, host=SERVER_HOST, port=SERVER_PORT):
+    handler = type("Handler", (DashboardRequestHandler,), {"backend": DashboardBackend(svc)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    from service import FastF1Service
+
+    parser = argparse.ArgumentParser(description="Serve dashboard charts and data over a local HTTP API.")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--offline", action="store_true", help="キャッシュ済みのセッションのみを提供する")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO,
+                        format="[%(asctime)s] %(levelname)s %(filename)s:%(lineno)d %(message)s")
+    logging.getLogger("fastf1").setLevel(logging.WARNING)
+    svc = FastF1Service(offline=args.offline)
+    server = make_server(svc, args.host, args.port)
+    logging.info(f"Serving on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,28 +2,107 @@
 FastF1 Service Module
 This module provides a service for managing FastF1 cache and loading sessions asynchronously.
 It includes a CacheManager for cache directory management and cleanup, and a FastF1Service for loading event schedules and sessions.
+In offline mode, schedules and sessions are served strictly from the local cache through an OfflineIndex.
+All work runs on the shared prioritised TaskScheduler (SCHEDULER); session loads report staged progress.
 """
 
 import os
-import shutil
+import logging
+import threading
+from collections import Counter
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor
 import fastf1
 from pathlib import Path # Added pathlib
 
-from config import CACHE_DIR as CACHE_DIR_STR, CACHE_SIZE_LIMIT_GB, CACHE_EXPIRE_DAYS
+from config import (CACHE_DIR as CACHE_DIR_STR, CACHE_SIZE_LIMIT_GB, CACHE_EXPIRE_DAYS, CACHE_COMPRESSION,
+                    CACHE_MIGRATE_ON_STARTUP, OFFLINE_MODE)
+import cache_storage
+from offline import OfflineIndex
+from scheduler import TaskScheduler, Priority, report_progress, checkpoint
+from analysis.compaction import compact_session, estimate_frame_bytes
+from analysis.session_meta import get_session_meta
+from analysis.stints import get_stint_model
+from analysis.telemetry_store import get_telemetry_store
+from analysis.session_summary import get_session_summary
+from analysis.dominance import get_dominance_profile
+from analysis.lap_context import get_lap_context
+from analysis.race_progress import get_race_progress, RACE_SESSIONS
+from session_pool import PinnedSession
+from exporter import export_session, session_dirname
 
 # Convert CACHE_DIR to Path object for easier manipulation
 CACHE_DIR = Path(CACHE_DIR_STR)
 
-# スレッドプール
-EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="FastF1Worker")
+# キャッシュ整理で削除しないファイル（warmup.py の再開用チェックポイント）
+WARMUP_CHECKPOINT_NAME = "warmup_checkpoint.json"
+
+# アプリ共通のタスクスケジューラ
+SCHEDULER = TaskScheduler(max_workers=4, thread_name_prefix="FastF1Worker")
+
+# FastF1 のログに現れるキャッシュ/API 名 -> (段階名, 進捗%)
+_LOAD_STAGES = [
+    ("session_info", "session", 5),
+    ("driver_info", "session", 10),
+    ("session_status_data", "laps", 15),
+    ("track_status_data", "laps", 20),
+    ("_extended_timing_data", "laps", 30),
+    ("timing_app_data", "laps", 40),
+    ("Processing timing data", "laps", 50),
+    ("car_data", "telemetry", 60),
+    ("position_data", "telemetry", 75),
+    ("weather_data", "weather", 85),
+    ("race_control_messages", "messages", 90),
+]
+
+
+class _LoadProgressHandler(logging.Handler):
+    """ロード中のスレッドが出す FastF1 のログを段階的な進捗に変換する。"""
+
+    def __init__(self):
+        super().__init__(level=logging.INFO)
+        self._thread = threading.get_ident()
+
+    def emit(self, record):
+        if record.thread != self._thread:
+            return
+        msg = record.getMessage()
+        for key, stage, percent in _LOAD_STAGES:
+            if key in msg:
+                report_progress(stage, percent)
+                return
+
+    def __enter__(self):
+        logging.getLogger("fastf1").addHandler(self)
+        return self
+
+    def __exit__(self, *exc):
+        logging.getLogger("fastf1").removeHandler(self)
+
 
 class CacheManager:
     @staticmethod
-    def ensure_cache_dir() -> None:
+    def ensure_cache_dir(offline: bool = False) -> None:
         CACHE_DIR.mkdir(parents=True, exist_ok=True)
-        fastf1.Cache.enable_cache(str(CACHE_DIR)) # fastf1.Cache.enable_cache expects a string
+        # オフライン時は再取得できないため、古い FastF1 バージョンで作られたキャッシュもそのまま使う
+        fastf1.Cache.enable_cache(str(CACHE_DIR), ignore_version=offline) # fastf1.Cache.enable_cache expects a string
+        fastf1.Cache.offline_mode(offline)
+        # 書き込みを圧縮・重複排除ストレージ経由にする（読み込みはポインタ経由で透過的に展開される）
+        cache_storage.install(CACHE_DIR, CACHE_COMPRESSION)
+
+    @staticmethod
+    def cache_size_bytes() -> int:
+        total_bytes = 0
+        for item in CACHE_DIR.rglob('*'):
+            try:
+                if item.is_file():
+                    total_bytes += item.stat().st_size
+            except FileNotFoundError:
+                continue
+        return total_bytes
+
+    @staticmethod
+    def size_limit_bytes() -> int:
+        return int(CACHE_SIZE_LIMIT_GB * 1024**3)
 
     @staticmethod
     def cleanup_cache() -> None:
@@ -43,37 +122,193 @@ class CacheManager:
                 except FileNotFoundError:
                     continue
                 total_bytes += stat.st_size
+                # 圧縮本体は複数のエントリから共有されるため期限では消さず、下の gc_objects で整理する
+                if cache_storage.OBJECTS_DIRNAME in item.parts:
+                    continue
                 if (now - datetime.fromtimestamp(stat.st_atime)).days > CACHE_EXPIRE_DAYS:
                     expired_files.append(item)
         
         for fp in expired_files:
             try:
+                size = fp.stat().st_size
                 fp.unlink() 
-                total_bytes -= fp.stat().st_size
+                total_bytes -= size
             except FileNotFoundError:
                 continue
             except Exception:
                 pass
 
+        storage = cache_storage.get_storage()
+        if expired_files and storage is not None:
+            storage.gc_objects()
 
-        if total_bytes > CACHE_SIZE_LIMIT_GB * 1024**3:
+        if total_bytes > CacheManager.size_limit_bytes():
+            freed = CacheManager.evict_oldest(total_bytes - CacheManager.size_limit_bytes())
+            logging.info(f"Cache over limit; evicted {freed / 1024**2:.0f}MB of least recently used sessions")
+
+    @staticmethod
+    def evict_oldest(excess_bytes: int) -> int:
+        """最も長く使われていないセッション（ディレクトリ単位）から順に削除し、excess_bytes 以上を空ける。
+
+        キャッシュ全体を消すと先読み済みのデータもすべて失われるため、古いものだけを削除する。
+        圧縮本体は参照しているエントリ数で按分して数え、削除後に参照されなくなった本体は gc_objects で消す。
+        戻り値は空けた（と見積もった）バイト数。
+        """
+        storage = cache_storage.get_storage()
+        groups = {}  # 親ディレクトリ（トップレベルのファイルはそのファイル） -> [最終アクセス時刻, バイト数, ファイル, ポインタ]
+        refs = Counter()
+        for item in CACHE_DIR.rglob('*'):
+            if cache_storage.OBJECTS_DIRNAME in item.parts or item.name == WARMUP_CHECKPOINT_NAME:
+                continue
             try:
-                shutil.rmtree(CACHE_DIR, ignore_errors=True)
-                CACHE_DIR.mkdir(parents=True, exist_ok=True)
-            except Exception:
+                if not item.is_file():
+                    continue
+                stat = item.stat()
+            except FileNotFoundError:
+                continue
+            group = groups.setdefault(item.parent if item.parent != CACHE_DIR else item, [0.0, 0, [], []])
+            group[0] = max(group[0], stat.st_atime)
+            group[1] += stat.st_size
+            group[2].append(item)
+            pointer = cache_storage.read_pointer(item) if storage is not None and item.suffix == '.ff1pkl' else None
+            if pointer is not None:
+                group[3].append(pointer[:2])
+                refs[pointer[:2]] += 1
+
+        freed = 0
+        for key, (_, size, files, pointers) in sorted(groups.items(), key=lambda kv: kv[1][0]):
+            if freed >= excess_bytes:
+                break
+            # サブディレクトリ（別セッション）は残し、このディレクトリ直下のファイルだけを消す
+            for fp in files:
+                try:
+                    fp.unlink()
+                except FileNotFoundError:
+                    pass
+                except Exception:
+                    continue
+            freed += size + sum(storage.object_size(*p) // refs[p] for p in pointers)
+            # 空になったディレクトリは親（イベント・年）までたどって削除する
+            parent = key if key.is_dir() else None
+            try:
+                while parent is not None and parent != CACHE_DIR and not any(parent.iterdir()):
+                    parent.rmdir()
+                    parent = parent.parent
+            except OSError:
                 pass
+        if storage is not None and freed:
+            storage.gc_objects()
+        return freed
+
+
+    @staticmethod
+    def compress_cache() -> None:
+        """既存の生 pickle を圧縮形式に変換し、キャッシュ統計をログに出す。"""
+        storage = cache_storage.get_storage()
+        if storage is None or storage.codec == "none":
+            return
+        converted = storage.migrate()
+        if converted:
+            logging.info(f"Compressed {converted} cache files")
+        logging.info(f"Cache stats: {cache_storage.format_stats(storage.stats())}")
+
+    @staticmethod
+    def cache_stats() -> dict:
+        storage = cache_storage.get_storage()
+        return storage.stats() if storage is not None else {}
+
+    @staticmethod
+    def run_maintenance() -> None:
+        CacheManager.cleanup_cache()
+        # 既存ファイルの変換は元に戻せず、素の fastf1 から読めなくなるため、設定で有効にした場合だけ行う
+        if CACHE_MIGRATE_ON_STARTUP:
+            CacheManager.compress_cache()
 
 
 class FastF1Service:
-    def __init__(self):
-        CacheManager.ensure_cache_dir()
+    def __init__(self, offline: bool = OFFLINE_MODE):
+        self.offline = offline
+        CacheManager.ensure_cache_dir(offline=offline)
+        self.offline_index = OfflineIndex(CACHE_DIR)
+
+    def set_offline(self, offline: bool) -> None:
+        if offline == self.offline:
+            return
+        self.offline = offline
+        CacheManager.ensure_cache_dir(offline=offline)
+        self.offline_index.refresh()
+
+    def get_event_schedule_async(self, year: int, token=None, **callbacks):
+        fn = self.offline_index.event_schedule if self.offline else fastf1.get_event_schedule
+        return SCHEDULER.submit(fn, year, priority=Priority.USER_VISIBLE, token=token,
+                                name=f"schedule {year}", **callbacks)
 
-    def get_event_schedule_async(self, year: int):
-        return EXECUTOR.submit(fastf1.get_event_schedule, year)
+    def _load_session(self, year: int, gp: str, ses: str, offline: bool):
+        report_progress("session", 0)
+        with _LoadProgressHandler():
+            if offline:
+                s = self.offline_index.load_session(year, gp, ses)
+            else:
+                s = fastf1.get_session(year, gp, ses)
+                s.load() 
+        checkpoint()
+        report_progress("compact", 93)
+        compact_session(s) # ダウンキャスト・カテゴリ化で常駐メモリを削減
+        report_progress("metadata", 97)
+        get_session_meta(s) # ドライバー/配色テーブルをワーカー側で構築しておく
+        return s
 
-    def load_session_async(self, year: int, gp: str, ses: str):
+    def load_session_async(self, year: int, gp: str, ses: str, token=None, **callbacks):
+        offline = self.offline
+        return SCHEDULER.submit(self._load_session, year, gp, ses, offline, priority=Priority.USER_VISIBLE,
+                                token=token, name=f"load {year} {gp} {ses}", **callbacks)
+
+    def pin_session_async(self, year: int, gp: str, ses: str, session=None, token=None, **callbacks):
+        """比較用にセッションをロードし、要約とメモリ見積もりを付けた PinnedSession を返す。
+        ロード済みの `session` が渡された場合は再ロードせず、要約だけを（未計算なら）計算する。"""
+        offline = self.offline
+        def _inner():
+            s = session if session is not None else self._load_session(year, gp, ses, offline)
+            checkpoint()
+            report_progress("summary", 98)
+            summary = get_session_summary(s)
+            return PinnedSession((year, gp, ses), s, summary, estimate_frame_bytes(s))
+        return SCHEDULER.submit(_inner, priority=Priority.USER_VISIBLE, token=token,
+                                name=f"pin {year} {gp} {ses}", **callbacks)
+
+    def prefetch_session_async(self, year: int, gp: str, ses: str, telemetry: bool = True, token=None, **callbacks):
+        """セッションをロードしてキャッシュに保存するだけの先読みタスク（結果は保持しない）。"""
         def _inner():
             s = fastf1.get_session(year, gp, ses)
-            s.load() 
-            return s
-        return EXECUTOR.submit(_inner)
\ No newline at end of file
+            checkpoint()
+            s.load(telemetry=telemetry)
+            return len(s.laps)
+        return SCHEDULER.submit(_inner, priority=Priority.PREFETCH, token=token,
+                                name=f"prefetch {year} {gp} {ses}", **callbacks)
+
+    def precompute_views_async(self, session, token=None):
+        """タブ表示で使う集計・索引をバックグラウンドで先に計算しておく。"""
+        tasks = []
+        if session.name in RACE_SESSIONS:
+            tasks.append(SCHEDULER.submit(get_race_progress, session, priority=Priority.VIEW_PRECOMPUTE,
+                                          token=token, name="race progress")) # ギャップ/順位の行列
+        return tasks + [
+            SCHEDULER.submit(get_stint_model, session, priority=Priority.VIEW_PRECOMPUTE,
+                             token=token, name="stint model"),
+            SCHEDULER.submit(get_telemetry_store, session, priority=Priority.VIEW_PRECOMPUTE,
+                             token=token, name="telemetry store"), # ラップ選択用のテレメトリ索引
+            SCHEDULER.submit(get_dominance_profile, session, priority=Priority.VIEW_PRECOMPUTE,
+                             token=token, name="dominance profile"), # ミニセクター比較用の距離グリッド
+            SCHEDULER.submit(get_lap_context, session, priority=Priority.VIEW_PRECOMPUTE,
+                             token=token, name="lap context"), # 周回ごとの天候・トラックステータス
+        ]
+
+    def export_sessions_async(self, sessions, out_dir, fmt="parquet", telemetry=True, token=None, **callbacks):
+        """ロード済みセッションの書き出しを、セッションごとに 1 タスクとしてワーカープールで並行実行する。"""
+        return [SCHEDULER.submit(export_session, s, out_dir, fmt, telemetry, priority=Priority.PREFETCH,
+                                 token=token, name=f"export {session_dirname(s)}", **callbacks)
+                for s in sessions]
+
+    def cleanup_cache_async(self):
+        return SCHEDULER.submit(CacheManager.run_maintenance, priority=Priority.MAINTENANCE,
+                                name="cache maintenance")
\ No newline at end of file
@@ -0,0 +1,83 @@
+"""
+Session Pool Module
+セッション間比較のために「ピン留め」された複数のセッションを保持します。
+各セッションの推定メモリ使用量（データフレームと、セッション単位でキャッシュした計算結果）を合計し、共有のメモリ予算（SESSION_MEMORY_BUDGET_MB）または
+最大件数（MAX_PINNED_SESSIONS）を超えた場合は、最も長く使われていないセッションから外します。
+Tk スレッドからのみ操作されることを前提としています（ロード完了コールバックはスケジューラが Tk に受け渡す）。
+"""
+
+import itertools
+import logging
+
+from config import SESSION_MEMORY_BUDGET_MB, MAX_PINNED_SESSIONS
+from analysis.session_cache import cached_bytes
+
+
+class PinnedSession:
+    def __init__(self, key, session, summary, frame_bytes):
+        self.key = key            # (year, gp, ses)
+        self.session = session
+        self.summary = summary    # analysis.session_summary.SessionSummary
+        self.frame_bytes = frame_bytes  # ロード時に見積もったデータフレーム分（以後変わらない）
+        self.last_used = 0
+
+    @property
+    def nbytes(self):
+        # テレメトリ索引などの計算結果は表示・事前計算のたびに増えるため、参照するたびに数え直す
+        return self.frame_bytes + cached_bytes(self.session)
+
+    @property
+    def label(self):
+        year, gp, ses = self.key
+        return f"{year} {gp.replace('Grand Prix', 'GP')} {ses}"
+
+
+class SessionPool:
+    def __init__(self, budget_bytes=SESSION_MEMORY_BUDGET_MB * 1024**2, max_sessions=MAX_PINNED_SESSIONS):
+        self.budget_bytes = budget_bytes
+        self.max_sessions = max_sessions
+        self._entries = {}   # key -> PinnedSession（ピン留め順）
+        self._clock = itertools.count(1)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def entries(self):
+        return list(self._entries.values())
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def contains_session(self, session):
+        return any(e.session is session for e in self._entries.values())
+
+    @property
+    def used_bytes(self):
+        return sum(e.nbytes for e in self._entries.values())
+
+    def touch(self, keys):
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.last_used = next(self._clock)
+
+    def add(self, entry: PinnedSession):
+        """`entry` を追加し、予算を超えた分だけ古いセッションを外す。外したエントリのリストを返す。"""
+        self._entries[entry.key] = entry
+        entry.last_used = next(self._clock)
+        evicted = []
+        while len(self._entries) > 1 and (self.used_bytes > self.budget_bytes
+                                          or len(self._entries) > self.max_sessions):
+            victim = min((e for e in self._entries.values() if e is not entry), key=lambda e: e.last_used)
+            evicted.append(self._entries.pop(victim.key))
+            logging.info(f"Unpinned {victim.label} to stay within the session memory budget")
+        if self.used_bytes > self.budget_bytes:
+            logging.warning(f"{entry.label} alone exceeds the session memory budget "
+                            f"({entry.nbytes / 1024**2:.0f} MB > {self.budget_bytes / 1024**2:.0f} MB)")
+        return evicted
+
+    def remove(self, key):
+        return self._entries.pop(key, None)
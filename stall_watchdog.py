@@ -0,0 +1,253 @@
+"""
+Stall Watchdog Module
+Tk のメインスレッドが応答しなくなった時間（イベントループの遅延）を計測し、長く止まった操作を自動的に記録します。
+
+- メインスレッドは WATCHDOG_INTERVAL_MS ごとに `after` のハートビートで時刻を記録するだけです。
+- 監視スレッドはハートビートの遅れが WATCHDOG_STALL_MS を超えている間だけ、`sys._current_frames()` で
+  メインスレッドのスタックを WATCHDOG_SAMPLE_MS 間隔でサンプリングします（止まっていない間は時刻を比べるだけ）。
+- サンプルしたスタックから、実行中の Sidebar のコマンド（`_cmd_*` / `_on_*`）と MainTab の `show_*` を特定し、
+  見つからなければ直前に終わった操作（`marks_operation` で記録）を原因とします（draw_idle による描画は後から
+  Tk のアイドル処理として実行され、その時点のスタックには操作のフレームが残っていないため）。
+  停止時間・原因の操作・頻出スタックを WATCHDOG_REPORT_PATH に書き出します。
+  レポートは直近 WATCHDOG_MAX_RECORDS 件を保持し（アプリを再起動しても引き継ぐ）、操作ごとの集計も含みます。
+
+例:
+    python stall_watchdog.py            # 保存済みレポートの集計を表示
+"""
+
+import argparse
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta
+
+from config import (WATCHDOG_INTERVAL_MS, WATCHDOG_STALL_MS, WATCHDOG_SAMPLE_MS, WATCHDOG_MAX_RECORDS,
+                    WATCHDOG_REPORT_PATH)
+
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+_STACK_DEPTH = 12   # レポートに残すスタックの深さ（内側から）
+_TOP_STACKS = 5     # 1 回の停止につき残す頻出スタックの数
+DEFERRED_WINDOW_S = 2.0  # 操作の終了からこの時間内に始まった停止は、その操作の後続の描画とみなす
+
+_last_operation = None  # (操作名, 終了時刻 perf_counter)。メインスレッドが書き、監視スレッドが読む
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    path = code.co_filename
+    if path.startswith(_ROOT):
+        path = os.path.relpath(path, _ROOT).replace(os.sep, "/")
+    else:
+        path = os.path.basename(path)
+    return f"{path}:{frame.f_lineno} {code.co_name}"
+
+
+def _walk(frame):
+    """外側 -> 内側の順にフレームを返す。"""
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    return frames[::-1]
+
+
+def _ui_operations(frames):
+    found = []
+    for frame in frames:
+        path, name = frame.f_code.co_filename, frame.f_code.co_name
+        if path.endswith(os.path.join("ui", "sidebar.py")) and name.startswith(("_cmd_", "_on_")):
+            found.append(f"Sidebar.{name}")
+        elif path.endswith(os.path.join("ui", "main_tab.py")) and name.startswith("show_"):
+            found.append(f"MainTab.{name}")
+    return found
+
+
+def _operation(frames, deferred=None):
+    """スタック中の Sidebar コマンドと MainTab.show_* を「Sidebar._cmd_x > MainTab.show_x」の形で返す。
+    該当するフレームが無く、直前の操作（deferred）があればその後続の描画とみなす。"""
+    found = _ui_operations(frames)
+    if found:
+        return " > ".join(dict.fromkeys(found))
+    if deferred is not None:
+        return f"{deferred} (deferred)"
+    # 該当が無ければ、アプリ内で最も内側のフレームを原因とする
+    for frame in reversed(frames):
+        if frame.f_code.co_filename.startswith(_ROOT):
+            return _frame_label(frame)
+    return "unknown"
+
+
+def marks_operation(fn):
+    """MainTab.show_* に付けるデコレーター。終了時に、呼び出し元の Sidebar コマンドを含めた操作名と時刻を記録する。"""
+    name = fn.__qualname__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        global _last_operation
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            found = _ui_operations(_walk(sys._getframe(1))) + [name]
+            _last_operation = (" > ".join(dict.fromkeys(found)), time.perf_counter())
+    return wrapper
+
+
+class StallWatchdog:
+    def __init__(self, root, interval_ms=WATCHDOG_INTERVAL_MS, stall_ms=WATCHDOG_STALL_MS,
+                 sample_ms=WATCHDOG_SAMPLE_MS, report_path=WATCHDOG_REPORT_PATH, max_records=WATCHDOG_MAX_RECORDS):
+        self.root = root
+        self.interval = interval_ms / 1000
+        self.threshold = stall_ms / 1000
+        self.sample_interval = sample_ms / 1000
+        self.report_path = report_path
+        self.records = deque(_load_records(report_path), maxlen=max_records)
+        self._main_ident = threading.main_thread().ident
+        self._beat_at = time.perf_counter()
+        self._after_id = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- main thread ---
+    def start(self):
+        if self._thread is not None:
+            return
+        self._beat_at = time.perf_counter()
+        self._after_id = self.root.after(int(self.interval * 1000), self._beat)
+        self._thread = threading.Thread(target=self._run, name="stall-watchdog", daemon=True)
+        self._thread.start()
+        logging.info(f"Stall watchdog started (threshold {self.threshold * 1000:.0f}ms, report: {self.report_path})")
+
+    def stop(self):
+        self._stop.set()
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def _beat(self):
+        # メインスレッドでは時刻の記録と次の予約だけを行う
+        self._beat_at = time.perf_counter()
+        if not self._stop.is_set():
+            self._after_id = self.root.after(int(self.interval * 1000), self._beat)
+
+    # --- watchdog thread ---
+    def _run(self):
+        stall = None  # 停止中: {"beat": 停止前のハートビート時刻, "samples": Counter, "started": 停止の開始時刻}
+        while not self._stop.wait(self.sample_interval if stall else self.threshold / 4):
+            beat = self._beat_at
+            now = time.perf_counter()
+            if stall is not None and beat != stall["beat"]:
+                # ハートビートが再開した = 停止が終わった
+                self._finish(stall, beat - stall["beat"] - self.interval)
+                stall = None
+                continue
+            if now - beat - self.interval < self.threshold:
+                continue
+            if stall is None:
+                stall = {"beat": beat, "samples": Counter(), "deferred": self._deferred(beat),
+                         "started": datetime.now() - timedelta(seconds=now - beat - self.interval)}
+            self._sample(stall["samples"], stall["deferred"])
+
+    @staticmethod
+    def _deferred(beat):
+        """停止の直前（または停止中）に終わった操作の名前。"""
+        last = _last_operation
+        if last is None or beat - last[1] > DEFERRED_WINDOW_S:
+            return None
+        return last[0]
+
+    def _sample(self, samples, deferred=None):
+        frame = sys._current_frames().get(self._main_ident)
+        if frame is None:
+            return
+        frames = _walk(frame)
+        stack = tuple(_frame_label(f) for f in frames[-_STACK_DEPTH:])
+        samples[(_operation(frames, deferred), stack)] += 1
+        del frame, frames
+
+    def _finish(self, stall, duration):
+        samples = stall["samples"]
+        ops = Counter()
+        for (op, _), n in samples.items():
+            ops[op] += n
+        operation = ops.most_common(1)[0][0] if ops else "unknown"
+        record = {
+            "time": stall["started"].isoformat(timespec="seconds"),
+            "duration_ms": round(duration * 1000, 1),
+            "operation": operation,
+            "samples": sum(samples.values()),
+            "stacks": [{"count": n, "stack": list(stack)}
+                       for (op, stack), n in samples.most_common(_TOP_STACKS)],
+        }
+        self.records.append(record)
+        logging.warning(f"UI stalled for {record['duration_ms']:.0f}ms in {operation}")
+        try:
+            _write_report(self.report_path, list(self.records))
+        except OSError as e:
+            logging.warning(f"Could not write stall report {self.report_path}: {e}")
+
+
+def _load_records(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("stalls", [])
+    except FileNotFoundError:
+        return []
+    except (OSError, ValueError, AttributeError) as e:
+        logging.warning(f"Ignoring unreadable stall report {path}: {e}")
+        return []
+
+
+def summarize(records):
+    """操作ごとの回数・合計・最大停止時間と、全停止を通した頻出フレーム（最も内側）の集計。"""
+    operations = {}
+    hot_frames = Counter()
+    for rec in records:
+        op = operations.setdefault(rec["operation"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        op["count"] += 1
+        op["total_ms"] = round(op["total_ms"] + rec["duration_ms"], 1)
+        op["max_ms"] = max(op["max_ms"], rec["duration_ms"])
+        for entry in rec["stacks"]:
+            if entry["stack"]:
+                hot_frames[entry["stack"][-1]] += entry["count"]
+    operations = dict(sorted(operations.items(), key=lambda kv: kv[1]["total_ms"], reverse=True))
+    return {"operations": operations, "hot_frames": hot_frames.most_common(20)}
+
+
+def _write_report(path, records):
+    report = {"updated": datetime.now().isoformat(timespec="seconds"), **summarize(records), "stalls": records}
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize the UI stall report written by the dashboard.")
+    parser.add_argument("--report", default=WATCHDOG_REPORT_PATH)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    records = _load_records(args.report)
+    if not records:
+        print(f"No stalls recorded in {args.report}")
+        return
+    summary = summarize(records)
+    print(f"{len(records)} stalls ({records[0]['time']} - {records[-1]['time']})")
+    print("\nOperation                                          count   total ms     max ms")
+    for name, op in list(summary["operations"].items())[:args.top]:
+        print(f"{name[:50]:<50} {op['count']:>5} {op['total_ms']:>10.0f} {op['max_ms']:>10.0f}")
+    print("\nHot frames (samples)")
+    for label, n in summary["hot_frames"][:args.top]:
+        print(f"{n:>6}  {label}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ import fastf1
 import fastf1.plotting
 import matplotlib.pyplot as plt
 from config import COLOR_FRAME, COLOR_ACCENT, COLOR_HIGHLIGHT, COLOR_TEXT
+from analysis.lap_context import affected_mask
 
 def init_compare(notebook):
     frame = tk.Frame(notebook, bg=COLOR_FRAME)
@@ -25,25 +26,55 @@ def show_compare(frame, session, drivers):
         tk.Label(frame, text="比較するドライバーを選択してください。", fg=COLOR_TEXT, bg=COLOR_FRAME).pack(expand=True)
         return
 
-    laps_df = session.laps.pick_quicklaps().reset_index()
+    quick = session.laps.pick_quicklaps()
     
-    if laps_df.empty:
+    if quick.empty:
         messagebox.showinfo("データなし", "比較対象のクイックラップが見つかりません。")
         tk.Label(frame, text="クイックラップデータなし", fg=COLOR_TEXT, bg=COLOR_FRAME).pack(expand=True)
         return
         
-    df = laps_df[laps_df['Driver'].isin(drivers)].copy()
+    quick = quick[quick['Driver'].isin(drivers)]
     
-    if df.empty:
+    if quick.empty:
         messagebox.showinfo("データなし", f"選択されたドライバー ({', '.join(drivers)}) のクイックラップが見つかりません。")
         tk.Label(frame, text="選択ドライバーのデータなし", fg=COLOR_TEXT, bg=COLOR_FRAME).pack(expand=True)
         return
-        
-    df['LapTime_s'] = df['LapTime'].dt.total_seconds()
+
+    # SC/VSC・雨天の周回を分布から除外するフィルタ（変更すると図をその場で描き直す）
+    bar = tk.Frame(frame, bg=COLOR_FRAME)
+    bar.pack(fill="x", padx=5)
+    exclude_caution = tk.BooleanVar(value=False)
+    exclude_wet = tk.BooleanVar(value=False)
+    for text, var in (("SC/VSC/赤旗の周回を除外", exclude_caution), ("雨天の周回を除外", exclude_wet)):
+        tk.Checkbutton(bar, text=text, variable=var, command=lambda: _redraw(),
+                       bg=COLOR_FRAME, fg=COLOR_TEXT, selectcolor=COLOR_FRAME,
+                       activebackground=COLOR_FRAME).pack(side="left")
+    excluded_lbl = tk.Label(bar, text="", fg=COLOR_TEXT, bg=COLOR_FRAME)
+    excluded_lbl.pack(side="left", padx=10)
 
     fig = plt.Figure(figsize=(6,4), dpi=100, facecolor=COLOR_FRAME)
-    ax = fig.add_subplot(111)
-    
+    canvas = FigureCanvasTkAgg(fig, master=frame)
+    canvas.get_tk_widget().pack(expand=True, fill="both")
+
+    def _redraw():
+        mask = affected_mask(session, quick.index, caution=exclude_caution.get(), wet=exclude_wet.get())
+        excluded_lbl.configure(text=f"除外: {int(mask.sum())} 周" if mask.any() else "")
+        df = quick[~mask.to_numpy()].reset_index()
+        df['LapTime_s'] = df['LapTime'].dt.total_seconds()
+        fig.clear()
+        ax = fig.add_subplot(111)
+        if df.empty:
+            ax.text(0.5, 0.5, "条件に合うラップがありません", ha='center', va='center',
+                    transform=ax.transAxes, color=COLOR_TEXT)
+            ax.set_facecolor(COLOR_FRAME); ax.axis('off')
+        else:
+            draw_compare(fig, ax, session, df, drivers)
+        canvas.draw_idle()
+
+    _redraw()
+
+def draw_compare(fig, ax, session, df, drivers):
+    # Tk に依存しない描画部分（サーバーモードからも使用する）。df は LapTime_s 列を持つクイックラップ
     # Ensure palette has enough colors, repeat if necessary
     num_drivers = len(df['Driver'].unique())
     palette = [COLOR_ACCENT] * num_drivers 
@@ -85,7 +116,3 @@ def show_compare(frame, session, drivers):
     for spine in ax.spines.values():
         spine.set_edgecolor(COLOR_TEXT)
     fig.tight_layout()
-
-    canvas = FigureCanvasTkAgg(fig, master=frame)
-    canvas.draw()
-    canvas.get_tk_widget().pack(expand=True, fill="both")
\ No newline at end of file
@@ -0,0 +1,127 @@
+"""
+距離軸のリンクズーム
+Telemetry / Speed Compare / Map は MainTab が持つ 1 つの DistanceLink を共有し、どれかのグラフで選んだ距離範囲を
+他のビューにも反映します（グラフはその範囲にズーム、マップは該当区間を強調表示）。
+範囲が変わるたびに、各ビューは TelemetryStore.window で範囲内のデータだけを切り出して線を差し替えます。
+
+距離グラフでの操作:
+    左ドラッグ: 範囲を選択してズーム / ホイール: カーソル位置を中心にズーム / 右ドラッグ: パン / ダブルクリック: 全体表示
+"""
+
+import weakref
+from matplotlib.widgets import SpanSelector
+from config import COLOR_ACCENT
+
+
+ZOOM_STEP = 1.25  # ホイール 1 段あたりの拡大率
+MIN_SPAN_M = 20   # これより狭い範囲にはズームしない
+
+
+class DistanceLink:
+    """同じセッションを表示しているビューの間で共有する距離範囲 [x0, x1]（None は全体表示）。"""
+
+    def __init__(self):
+        self._session = None  # weakref.ref: 置き換えられたセッションを保持し続けないため
+        self.range = None
+        self._listeners = []  # (session の weakref, callback)
+
+    def _bind(self, session):
+        if self._session is None or self._session() is not session:
+            self._session = weakref.ref(session)
+            self.range = None
+
+    def subscribe(self, session, callback):
+        """callback(range) を登録し、登録解除用の関数を返す。"""
+        self._bind(session)
+        entry = (weakref.ref(session), callback)
+        self._listeners.append(entry)
+        def _unsubscribe():
+            if entry in self._listeners:
+                self._listeners.remove(entry)
+        return _unsubscribe
+
+    def set_range(self, session, x0=None, x1=None):
+        self._bind(session)
+        self.range = None if x0 is None or x1 is None else (min(x0, x1), max(x0, x1))
+        for ref, callback in list(self._listeners):
+            if ref() is session:
+                callback(self.range)
+
+
+class LinkedZoom:
+    """距離を横軸に持つグラフに、範囲選択・ホイールズーム・パンを付けて DistanceLink とつなぐ。
+
+    on_range(range) は範囲が変わるたび（自分の操作でも他のビューの操作でも）に呼ばれ、
+    範囲内のデータで線を更新するのは表示側の役割。
+    """
+
+    def __init__(self, canvas, ax, session, link, on_range, extent):
+        self.canvas = canvas
+        self.ax = ax
+        self.session = session
+        self.link = link
+        self.on_range = on_range
+        self.extent = extent  # 全体表示時の (x0, x1)
+        self._pan = None
+        self.selector = SpanSelector(ax, self._on_select, "horizontal", useblit=True, minspan=MIN_SPAN_M,
+                                     props=dict(alpha=0.25, facecolor=COLOR_ACCENT), button=1)
+        self._cids = [canvas.mpl_connect("scroll_event", self._on_scroll),
+                      canvas.mpl_connect("button_press_event", self._on_press),
+                      canvas.mpl_connect("motion_notify_event", self._on_motion),
+                      canvas.mpl_connect("button_release_event", self._on_release)]
+        self._unsubscribe = link.subscribe(session, on_range)
+        # Tk のバインドが参照を持つため、ウィジェットが破棄されるまでこのオブジェクトは生き続ける
+        canvas.get_tk_widget().bind("<Destroy>", self._on_destroy, add="+")
+
+    def current(self):
+        return self.link.range or self.extent
+
+    def _set(self, x0, x1):
+        lo, hi = self.extent
+        span = min(max(x1 - x0, MIN_SPAN_M), hi - lo)
+        x0 = min(max(x0, lo), hi - span)
+        if span >= hi - lo:
+            self.link.set_range(self.session) # 全体表示
+        else:
+            self.link.set_range(self.session, x0, x0 + span)
+
+    def _on_select(self, x0, x1):
+        self._set(x0, x1)
+
+    def _on_scroll(self, event):
+        if event.inaxes is not self.ax or event.xdata is None:
+            return
+        x0, x1 = self.current()
+        scale = 1 / ZOOM_STEP if event.button == "up" else ZOOM_STEP
+        self._set(event.xdata - (event.xdata - x0) * scale, event.xdata + (x1 - event.xdata) * scale)
+
+    def _on_press(self, event):
+        if event.inaxes is not self.ax:
+            return
+        if event.dblclick:
+            self.link.set_range(self.session)
+        elif event.button == 3 and event.x is not None:
+            self._pan = (event.x, self.current())
+
+    def _on_motion(self, event):
+        if self._pan is None or event.x is None:
+            return
+        start_px, (x0, x1) = self._pan
+        dx = (event.x - start_px) / max(self.ax.bbox.width, 1) * (x1 - x0)
+        self._set(x0 - dx, x1 - dx)
+
+    def _on_release(self, event):
+        self._pan = None
+
+    def _on_destroy(self, event=None):
+        if event is not None and event.widget is not self.canvas.get_tk_widget():
+            return
+        self._unsubscribe()
+        for cid in self._cids:
+            self.canvas.mpl_disconnect(cid)
+        self.selector.disconnect_events()
+
+
+def lod_points(ax):
+    """軸の幅に見合う描画点数（最小・最大の 2 点 / ピクセル）。"""
+    return max(400, int(ax.bbox.width) * 2)
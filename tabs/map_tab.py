@@ -1,11 +1,19 @@
 import math
 import numpy as np
+import pandas as pd
 import tkinter as tk
 from tkinter import messagebox
 import fastf1
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import matplotlib.pyplot as plt
-from config import COLOR_FRAME, COLOR_HIGHLIGHT, COLOR_TEXT
+from matplotlib.collections import LineCollection
+from matplotlib.lines import Line2D
+from config import COLOR_ACCENT, COLOR_FRAME, COLOR_HIGHLIGHT, COLOR_TEXT
+from analysis.dominance import get_dominance_profile
+from analysis.session_meta import get_session_meta
+from analysis.telemetry_store import get_telemetry_store
+
+DEFAULT_MINISECTORS = 25
 
 def init_map(notebook):
     frame = tk.Frame(notebook, bg=COLOR_FRAME)
@@ -18,7 +26,21 @@ def _clear_frame_widgets(frame):
     for widget in frame.winfo_children():
         widget.destroy()
 
-def show_map(frame, session):
+def _circuit_rotation(session):
+    try:
+        cinfo = session.get_circuit_info()
+    except Exception as e: # オフライン時などはコーナー情報なしで描画する
+        print(f"サーキット情報を取得できません: {e}")
+        return None, 0.0
+    return cinfo, cinfo.rotation / 180 * math.pi
+
+def _rotate_track(coords, theta):
+    # 回転行列適用
+    R = np.array([[math.cos(theta), -math.sin(theta)],
+                  [math.sin(theta),  math.cos(theta)]])
+    return coords @ R
+
+def show_map(frame, session, link=None):
     _clear_frame_widgets(frame) # Clear previous content, including error messages
 
     # 最速ラップと位置データ取得
@@ -40,14 +62,9 @@ def show_map(frame, session):
         tk.Label(frame, text="位置データ取得エラー", fg=COLOR_TEXT, bg=COLOR_FRAME).pack(expand=True)
         return
 
-    cinfo = session.get_circuit_info()
+    cinfo, theta = _circuit_rotation(session)
     coords = pos.loc[:, ("X", "Y")].to_numpy()
-    theta = cinfo.rotation / 180 * math.pi
-
-    # 回転行列適用
-    R = np.array([[math.cos(theta), -math.sin(theta)],
-                  [math.sin(theta),  math.cos(theta)]])
-    track = coords @ R
+    track = _rotate_track(coords, theta)
 
     # 描画
     fig = plt.Figure(figsize=(6,4), dpi=100, facecolor=COLOR_FRAME)
@@ -61,7 +78,8 @@ def show_map(frame, session):
         return pt @ np.array([[math.cos(ang), -math.sin(ang)],
                               [math.sin(ang),  math.cos(ang)]])
 
-    for _, corner in cinfo.corners.iterrows():
+    corners = cinfo.corners if cinfo is not None else pd.DataFrame()
+    for _, corner in corners.iterrows():
         txt    = f"{corner['Number']}{corner['Letter']}"
         ang_off= corner['Angle']/180*math.pi
         off    = _rot(offset0, ang_off)
@@ -83,4 +101,106 @@ def show_map(frame, session):
 
     canvas = FigureCanvasTkAgg(fig, master=frame)
     canvas.draw()
-    canvas.get_tk_widget().pack(expand=True, fill="both")
\ No newline at end of file
+    canvas.get_tk_widget().pack(expand=True, fill="both")
+
+    # Telemetry / Speed Compare で選ばれた距離範囲をコース上に強調表示する
+    if link is not None:
+        distance = _track_distance(session, lap, track)
+        highlight, = ax.plot([], [], color=COLOR_ACCENT, linewidth=5, alpha=0.8, solid_capstyle='round')
+        def _on_range(rng):
+            mask = np.zeros(len(track), dtype=bool) if rng is None else (distance >= rng[0]) & (distance <= rng[1])
+            highlight.set_data(track[mask, 0], track[mask, 1])
+            canvas.draw_idle()
+        unsubscribe = link.subscribe(session, _on_range)
+        canvas.get_tk_widget().bind("<Destroy>", lambda e: unsubscribe(), add="+")
+        _on_range(link.range)
+
+def _track_distance(session, lap, track):
+    """コース上の各点のラップ先頭からの距離 [m]。テレメトリの距離（速度の積分）と目盛りを揃える。"""
+    steps = np.hypot(*np.diff(track, axis=0).T) / 10 # 位置データの単位は 1/10 m
+    distance = np.concatenate([[0.0], np.cumsum(steps)])
+    tel = get_telemetry_store(session).lap(lap['Driver'], int(lap['LapNumber']))
+    if tel is not None and len(tel['Distance']) and distance[-1] > 0:
+        distance *= float(tel['Distance'][-1]) / distance[-1]
+    return distance
+
+def show_dominance(frame, session, drivers):
+    """ミニセクターごとの最速ドライバーでコースを色分けするトラックドミナンス表示。"""
+    _clear_frame_widgets(frame)
+    tk.Label(frame, text="🗺️ トラックドミナンス（ミニセクター最速）", fg=COLOR_TEXT, bg=COLOR_FRAME).pack()
+
+    profile = get_dominance_profile(session)
+    if profile.outline is None or not profile.drivers:
+        tk.Label(frame, text="位置データまたはテレメトリがないため表示できません。", fg=COLOR_TEXT, bg=COLOR_FRAME).pack(expand=True)
+        return
+    meta = get_session_meta(session)
+    _, theta = _circuit_rotation(session)
+    track = _rotate_track(profile.outline.astype(np.float64), theta)
+    points = track.reshape(-1, 1, 2)
+    segments = np.concatenate([points[:-1], points[1:]], axis=1)
+
+    # 操作パネル: ミニセクター数とドライバー（変更すると図をその場で描き直す）
+    controls = tk.Frame(frame, bg=COLOR_FRAME)
+    controls.pack(side="left", fill="y", padx=5)
+    tk.Label(controls, text="ミニセクター数", fg=COLOR_TEXT, bg=COLOR_FRAME).pack(anchor="w")
+    n_var = tk.IntVar(value=DEFAULT_MINISECTORS)
+    n_spin = tk.Spinbox(controls, from_=3, to=100, textvariable=n_var, width=6)
+    n_spin.pack(anchor="w")
+    tk.Label(controls, text="ドライバー", fg=COLOR_TEXT, bg=COLOR_FRAME).pack(anchor="w", pady=(5,0))
+    drv_lb = tk.Listbox(controls, selectmode="multiple", exportselection=False, width=8, height=20)
+    drv_lb.pack(anchor="w", fill="y", expand=True)
+    for i, drv in enumerate(profile.drivers):
+        drv_lb.insert(tk.END, drv)
+        if drv in drivers:
+            drv_lb.selection_set(i)
+    if not drv_lb.curselection():
+        drv_lb.selection_set(0, tk.END) # 未選択なら全ドライバーで比較
+
+    fig = plt.Figure(figsize=(6,4), dpi=100, facecolor=COLOR_FRAME)
+    ax = fig.add_subplot(111)
+    canvas = FigureCanvasTkAgg(fig, master=frame)
+    canvas.get_tk_widget().pack(side="left", expand=True, fill="both")
+
+    def _redraw(event=None):
+        try:
+            n = max(3, int(n_var.get()))
+        except (tk.TclError, ValueError):
+            return
+        selected = [drv_lb.get(i) for i in drv_lb.curselection()]
+        winners = profile.winners(selected, n)
+        if len(winners) == 0:
+            return
+        colors = _dominance_colors(meta, sorted(set(winners)))
+        segment_colors = [colors[w] for w in winners[profile.outline_sectors(n)[:-1]]]
+
+        ax.clear()
+        ax.add_collection(LineCollection(segments, colors=segment_colors, linewidths=4, capstyle='round'))
+        ax.autoscale_view()
+        handles = [Line2D([0], [0], color=c, lw=4, label=f"{d} ({int(np.sum(winners == d))})")
+                   for d, c in colors.items()]
+        leg = ax.legend(handles=handles, loc='best', fontsize=7)
+        plt.setp(leg.get_texts(), color=COLOR_TEXT)
+        leg.get_frame().set_facecolor(COLOR_FRAME)
+        leg.get_frame().set_edgecolor(COLOR_TEXT)
+        ax.set_title(f"Track Dominance ({n} minisectors) – {session.event['Location']} {session.event.year}",
+                     color=COLOR_TEXT, fontsize=9)
+        ax.set_aspect("equal"); ax.axis("off")
+        fig.tight_layout()
+        canvas.draw_idle()
+
+    n_spin.configure(command=_redraw)
+    n_spin.bind("<Return>", _redraw)
+    drv_lb.bind("<<ListboxSelect>>", _redraw)
+    _redraw()
+
+def _dominance_colors(meta, drivers):
+    # チームメイト同士は同色になるため、重複した場合は汎用パレットの色に置き換える
+    palette = plt.get_cmap('tab10').colors
+    colors, used = {}, set()
+    for i, drv in enumerate(drivers):
+        color = meta.driver_style(drv)['color']
+        if color in used:
+            color = palette[i % len(palette)]
+        used.add(color)
+        colors[drv] = color
+    return colors
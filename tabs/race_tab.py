@@ -0,0 +1,104 @@
+"""
+レース推移（リーダーとのギャップ / 周回ごとの順位）
+各グラフは全ドライバー分を 1 つの LineCollection として描画し、ホバー時は事前計算した行列から周回を引くだけで表示を更新します。
+"""
+
+import tkinter as tk
+import numpy as np
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.collections import LineCollection
+import matplotlib.pyplot as plt
+from matplotlib.colors import to_rgba
+from config import COLOR_FRAME, COLOR_TEXT
+from analysis.race_progress import get_race_progress
+from analysis.session_meta import get_session_meta
+
+def init_race(notebook):
+    frame = tk.Frame(notebook, bg=COLOR_FRAME)
+    tk.Label(frame, text="🏁 レース推移", fg=COLOR_TEXT, bg=COLOR_FRAME).pack()
+    notebook.add(frame, text="🏁 Race Progress")
+    return frame
+
+def _clear_frame_widgets(frame):
+    for widget in frame.winfo_children():
+        widget.destroy()
+
+def show_race_progress(frame, session, drivers):
+    _clear_frame_widgets(frame)
+    tk.Label(frame, text="🏁 レース推移（リーダーとのギャップ / 順位）", fg=COLOR_TEXT, bg=COLOR_FRAME).pack()
+
+    progress = get_race_progress(session)
+    if not progress.drivers:
+        tk.Label(frame, text="ラップデータがないため表示できません。", fg=COLOR_TEXT, bg=COLOR_FRAME).pack(expand=True)
+        return
+    meta = get_session_meta(session)
+
+    # 選択ドライバーは太く、それ以外は薄く描く（未選択なら全員を同じ太さで表示）
+    highlight = set(drivers)
+    colors, widths, styles = [], [], []
+    for drv in progress.drivers:
+        style = meta.driver_style(drv)
+        faded = bool(highlight) and drv not in highlight
+        colors.append(_with_alpha(style['color'], 0.25 if faded else 1.0))
+        widths.append(2.2 if drv in highlight else 1.0)
+        styles.append(style['linestyle'])
+
+    fig = plt.Figure(figsize=(8,6), dpi=100, facecolor=COLOR_FRAME)
+    ax_gap, ax_pos = fig.subplots(2, 1, sharex=True)
+    for ax, kind in ((ax_gap, "gap"), (ax_pos, "position")):
+        ax.add_collection(LineCollection(progress.lines(kind), colors=colors, linewidths=widths, linestyles=styles))
+        ax.autoscale_view()
+        _style_axes(fig, ax)
+    ax_gap.invert_yaxis(); ax_gap.set_ylabel("Gap to leader (s)", color=COLOR_TEXT)
+    ax_pos.invert_yaxis(); ax_pos.set_ylabel("Position", color=COLOR_TEXT)
+    ax_pos.set_yticks(np.arange(1, len(progress.drivers) + 1, 2))
+    ax_pos.set_xlabel("Lap", color=COLOR_TEXT)
+    # 右端に最終順位のドライバー名を表示する
+    for i, drv in enumerate(progress.drivers):
+        valid = np.flatnonzero(~np.isnan(progress.positions[i]))
+        if len(valid):
+            j = valid[-1]
+            ax_pos.text(progress.lap_numbers[j] + 0.5, progress.positions[i, j], drv,
+                        color=colors[i], fontsize=6, va='center')
+    ax_gap.set_title(f"Race Progress – {session.event['EventName']} {session.event.year} {session.name}",
+                     color=COLOR_TEXT, fontsize=9)
+    cursors = [ax.axvline(progress.lap_numbers[0], color=COLOR_TEXT, linewidth=0.6, alpha=0.0)
+               for ax in (ax_gap, ax_pos)]
+    fig.tight_layout()
+
+    canvas = FigureCanvasTkAgg(fig, master=frame)
+    canvas.get_tk_widget().pack(side="left", expand=True, fill="both")
+    info = tk.Label(frame, text="", fg=COLOR_TEXT, bg=COLOR_FRAME, justify=tk.LEFT, anchor="nw",
+                    font=('TkFixedFont', 9), width=24)
+    info.pack(side="left", fill="y", padx=5)
+    canvas.draw()
+
+    state = {"lap": None}
+    def _on_move(event):
+        if event.inaxes not in (ax_gap, ax_pos) or event.xdata is None:
+            return
+        lap = float(round(event.xdata))
+        if lap == state["lap"]:
+            return
+        rows = progress.lookup(lap)
+        if not rows:
+            return
+        state["lap"] = lap
+        info.configure(text=f"Lap {int(lap)}\n" + "\n".join(
+            f"{'▶' if drv in highlight else ' '}P{pos:<2} {drv}  +{gap:6.1f}s" for pos, drv, gap in rows))
+        for cursor in cursors:
+            cursor.set_xdata([lap, lap])
+            cursor.set_alpha(0.8)
+        canvas.draw_idle()
+
+    canvas.mpl_connect("motion_notify_event", _on_move)
+
+def _with_alpha(color, alpha):
+    return to_rgba(color, alpha)
+
+def _style_axes(fig, ax):
+    ax.grid(color="#333333")
+    ax.set_facecolor(COLOR_FRAME); fig.patch.set_facecolor(COLOR_FRAME)
+    ax.tick_params(colors=COLOR_TEXT, which='both')
+    for spine in ax.spines.values():
+        spine.set_edgecolor(COLOR_TEXT)
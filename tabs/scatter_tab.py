@@ -1,10 +1,14 @@
 import tkinter as tk
 from tkinter import messagebox
 import seaborn as sns
+import numpy as np
 import pandas as pd
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import matplotlib.pyplot as plt
 from config import COLOR_FRAME, COLOR_TEXT
+from analysis.session_meta import get_session_meta
+from analysis.stints import get_stint_model, fitted_lap_times
+from analysis.lap_context import get_lap_context
 import fastf1
 import fastf1.plotting
 
@@ -23,6 +27,67 @@ def _clear_frame_widgets(frame):
     for widget in frame.winfo_children():
         widget.destroy()
 
+def _draw_stint_fits(ax, stint_model, driver, compound_mapping):
+    # スティントごとの燃料補正済みデグラデーション直線を重ねる
+    if driver not in stint_model.index.get_level_values('Driver'):
+        return
+    for _, stint in stint_model.loc[driver].dropna(subset=['Slope']).iterrows():
+        x = [stint['StartLap'], stint['EndLap']]
+        y = fitted_lap_times(stint, x)
+        color = compound_mapping.get(stint['Compound'], COLOR_TEXT)
+        ax.plot(x, y, color=color, linestyle='--', linewidth=1.2)
+        ax.text(x[1], y[1], f"{stint['Slope']:+.3f}s/lap", color=color, fontsize=6,
+                ha='left', va='center')
+
+OVERLAYS = [
+    ("caution", "SC/VSC/赤旗の周回", "#FFC107"),
+    ("wet", "雨天の周回", "#2196F3"),
+    ("temp", "路面温度", "#E91E63"),
+]
+
+def _overlay_controls(frame, on_change):
+    # 重ね表示の切り替え（変更すると図をその場で描き直す）
+    bar = tk.Frame(frame, bg=COLOR_FRAME)
+    bar.pack(fill="x", padx=5)
+    tk.Label(bar, text="重ね表示:", fg=COLOR_TEXT, bg=COLOR_FRAME).pack(side="left")
+    overlay_vars = {}
+    for key, label, _ in OVERLAYS:
+        overlay_vars[key] = tk.BooleanVar(value=key != "temp")
+        tk.Checkbutton(bar, text=label, variable=overlay_vars[key], command=on_change,
+                       bg=COLOR_FRAME, fg=COLOR_TEXT, selectcolor=COLOR_FRAME,
+                       activebackground=COLOR_FRAME).pack(side="left")
+    return overlay_vars
+
+def _shade_laps(ax, lap_numbers, color):
+    # 連続した周回をまとめて 1 つの帯として塗る
+    laps = np.unique(lap_numbers)
+    if len(laps) == 0:
+        return
+    breaks = np.flatnonzero(np.diff(laps) > 1)
+    starts = laps[np.concatenate([[0], breaks + 1])]
+    ends = laps[np.concatenate([breaks, [len(laps) - 1]])]
+    for start, end in zip(starts, ends):
+        ax.axvspan(start - 0.5, end + 0.5, color=color, alpha=0.18, linewidth=0)
+
+def _draw_lap_context(ax, session, driver, overlays):
+    """ドライバーの全周回（クイックラップ以外も含む）について、SC/VSC・雨天の周回に影を付け、路面温度を重ねる。"""
+    if not any(overlays.values()):
+        return
+    laps = session.laps
+    driver_laps = laps[laps['Driver'] == driver]
+    context = get_lap_context(session).loc[driver_laps.index]
+    lap_numbers = driver_laps['LapNumber'].to_numpy()
+    colors = {key: color for key, _, color in OVERLAYS}
+    if overlays.get("caution"):
+        _shade_laps(ax, lap_numbers[context['Caution'].to_numpy()], colors["caution"])
+    if overlays.get("wet"):
+        _shade_laps(ax, lap_numbers[context['Wet'].to_numpy()], colors["wet"])
+    if overlays.get("temp") and context['TrackTemp'].notna().any():
+        twin = ax.twinx()
+        twin.plot(lap_numbers, context['TrackTemp'].to_numpy(dtype=float), color=colors["temp"], linewidth=0.8)
+        twin.set_ylabel("Track °C", color=colors["temp"], fontsize=7)
+        twin.tick_params(colors=colors["temp"], labelsize=6)
+
 def show_scatter_compare(frame, session, drivers): # For multiple drivers
     _clear_frame_widgets(frame)
     tk.Label(frame, text="📊 ラップタイム散布図比較 (複数ドライバー)", fg=COLOR_TEXT, bg=COLOR_FRAME).pack()
@@ -58,10 +123,28 @@ def show_scatter_compare(frame, session, drivers): # For multiple drivers
         y_axis_label = "Lap Time"
 
 
-    fig, axes = plt.subplots(2, 2, figsize=(8,6), facecolor=COLOR_FRAME)
-    plt.subplots_adjust(hspace=0.4, wspace=0.3)
+    compound_mapping = get_session_meta(session).compound_mapping
+    stint_model = get_stint_model(session)
+
+    overlay_vars = _overlay_controls(frame, lambda: _redraw())
+    # pyplot の管理下に置かない Figure を使い、タブ再描画のたびに図が溜まらないようにする
+    fig = plt.Figure(figsize=(8,6), facecolor=COLOR_FRAME)
+    canvas = FigureCanvasTkAgg(fig, master=frame)
+    canvas.get_tk_widget().pack(expand=True, fill="both")
+
+    def _redraw():
+        fig.clear()
+        overlays = {key: var.get() for key, var in overlay_vars.items()}
+        _draw_scatter_grid(fig, session, plot_drivers, laps_to_plot_df, y_axis_col, y_axis_label,
+                           compound_mapping, stint_model, overlays)
+        canvas.draw_idle()
+
+    _redraw()
 
-    compound_mapping = fastf1.plotting.get_compound_mapping(session=session, weekend=False) # weekend=False might be needed for older data
+def _draw_scatter_grid(fig, session, plot_drivers, laps_to_plot_df, y_axis_col, y_axis_label,
+                       compound_mapping, stint_model, overlays):
+    axes = fig.subplots(2, 2)
+    fig.subplots_adjust(hspace=0.4, wspace=0.3)
 
     for i, drv in enumerate(plot_drivers):
         ax = axes.flatten()[i]
@@ -76,10 +159,13 @@ def show_scatter_compare(frame, session, drivers): # For multiple drivers
             ax.set_title(drv, color=COLOR_TEXT, fontsize=8)
             continue
 
+        _draw_lap_context(ax, session, drv, overlays)
         sns.scatterplot(data=df_driver, x="LapNumber", y=y_axis_col,
                         hue="Compound",
                         palette=compound_mapping,
                         s=40, linewidth=0, ax=ax, legend=(i==0)) # Show legend only for the first plot
+        if y_axis_col == 'LapTime_s':
+            _draw_stint_fits(ax, stint_model, drv, compound_mapping)
         
         if i==0 and ax.get_legend() is not None:
             leg = ax.get_legend()
@@ -105,10 +191,6 @@ def show_scatter_compare(frame, session, drivers): # For multiple drivers
     # fig.suptitle(f"Laptime Scatter Comparison - {session.event.year} {session.event['EventName']}", color=COLOR_TEXT) # Optional super title
     fig.tight_layout(rect=[0, 0, 1, 0.96]) # Adjust layout to make space for suptitle if used
 
-    canvas = FigureCanvasTkAgg(fig, master=frame)
-    canvas.draw()
-    canvas.get_tk_widget().pack(expand=True, fill="both")
-
 def show_single_driver_scatter(frame, session, driver_abbreviation):
     _clear_frame_widgets(frame)
     tk.Label(frame, text=f"📊 ラップタイム散布図 ({driver_abbreviation})", fg=COLOR_TEXT, bg=COLOR_FRAME).pack()
@@ -130,15 +212,31 @@ def show_single_driver_scatter(frame, session, driver_abbreviation):
         y_axis_col = 'LapTime'
         y_axis_label = "Lap Time"
 
+    compound_mapping = get_session_meta(session).compound_mapping
+    overlay_vars = _overlay_controls(frame, lambda: _redraw())
     fig = plt.Figure(figsize=(7,5), dpi=100, facecolor=COLOR_FRAME)
-    ax = fig.add_subplot(111)
-    
-    compound_mapping = fastf1.plotting.get_compound_mapping(session=session, weekend=False)
+    canvas = FigureCanvasTkAgg(fig, master=frame)
+    canvas.get_tk_widget().pack(expand=True, fill="both")
+
+    def _redraw():
+        fig.clear()
+        overlays = {key: var.get() for key, var in overlay_vars.items()}
+        _draw_single_scatter(fig, session, driver_abbreviation, laps_to_plot_df, y_axis_col, y_axis_label,
+                             compound_mapping, overlays)
+        canvas.draw_idle()
 
+    _redraw()
+
+def _draw_single_scatter(fig, session, driver_abbreviation, laps_to_plot_df, y_axis_col, y_axis_label,
+                         compound_mapping, overlays):
+    ax = fig.add_subplot(111)
+    _draw_lap_context(ax, session, driver_abbreviation, overlays)
     sns.scatterplot(data=laps_to_plot_df, x="LapNumber", y=y_axis_col,
                     hue="Compound",
                     palette=compound_mapping,
                     s=50, linewidth=0, ax=ax, legend="auto")
+    if y_axis_col == 'LapTime_s':
+        _draw_stint_fits(ax, get_stint_model(session), driver_abbreviation, compound_mapping)
     
     if ax.get_legend() is not None:
         leg = ax.get_legend()
@@ -157,7 +255,4 @@ def show_single_driver_scatter(frame, session, driver_abbreviation):
     for spine in ax.spines.values():
         spine.set_edgecolor(COLOR_TEXT)
 
-    fig.tight_layout()
-    canvas = FigureCanvasTkAgg(fig, master=frame)
-    canvas.draw()
-    canvas.get_tk_widget().pack(expand=True, fill="both")
\ No newline at end of file
+    fig.tight_layout()
\ No newline at end of file
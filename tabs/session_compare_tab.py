@@ -0,0 +1,104 @@
+"""
+ピン留めした複数セッションの比較（ラップタイム分布 / 最速ラップ速度）
+各セッションの要約（SessionSummary）だけを使って描画するため、セッションを追加しても他のセッションは再計算されません。
+"""
+
+import tkinter as tk
+import pandas as pd
+import seaborn as sns
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import matplotlib.pyplot as plt
+from config import COLOR_FRAME, COLOR_TEXT
+from analysis.session_meta import get_session_meta
+
+SESSION_LINESTYLES = ['solid', 'dashed', 'dotted', 'dashdot']
+SESSION_PALETTE = ['#007ACC', '#FF5722', '#4CAF50', '#FFC107', '#9C27B0', '#00BCD4']
+MAX_TRACES_PER_SESSION = 3
+
+def init_session_compare(notebook):
+    frame = tk.Frame(notebook, bg=COLOR_FRAME)
+    tk.Label(frame, text="📌 セッション間比較", fg=COLOR_TEXT, bg=COLOR_FRAME).pack()
+    notebook.add(frame, text="📌 Session Compare")
+    return frame
+
+def _clear_frame_widgets(frame):
+    for widget in frame.winfo_children():
+        widget.destroy()
+
+def show_session_laptimes(frame, entries, drivers):
+    _clear_frame_widgets(frame)
+    tk.Label(frame, text="📌 セッション間ラップタイム分布", fg=COLOR_TEXT, bg=COLOR_FRAME).pack()
+
+    parts = []
+    for entry in entries:
+        df = entry.summary.lap_times
+        if drivers:
+            df = df[df['Driver'].isin(drivers)]
+        if not df.empty:
+            parts.append(df.assign(Session=entry.label))
+    if not parts:
+        tk.Label(frame, text="比較できるクイックラップがありません。", fg=COLOR_TEXT, bg=COLOR_FRAME).pack(expand=True)
+        return
+    data = pd.concat(parts, ignore_index=True)
+    order = [e.label for e in entries if e.label in set(data['Session'])]
+
+    fig = plt.Figure(figsize=(6,4), dpi=100, facecolor=COLOR_FRAME)
+    ax = fig.add_subplot(111)
+    sns.violinplot(data=data, x='Session', y='LapTime_s', hue='Session', order=order, hue_order=order,
+                   palette=SESSION_PALETTE[:len(order)], inner='quartile', cut=0, legend=False, ax=ax)
+    ax.invert_yaxis()
+    ax.set_xlabel("Session"); ax.set_ylabel("LapTime (s)")
+    who = ", ".join(drivers) if drivers else "All drivers"
+    _style_axes(fig, ax, f"Quick Lap Distribution – {who}")
+    _pack_canvas(frame, fig)
+
+def show_session_speed(frame, entries, drivers):
+    _clear_frame_widgets(frame)
+    tk.Label(frame, text="📌 セッション間最速ラップ速度比較", fg=COLOR_TEXT, bg=COLOR_FRAME).pack()
+
+    fig = plt.Figure(figsize=(6,4), dpi=100, facecolor=COLOR_FRAME)
+    ax = fig.add_subplot(111)
+    plotted = 0
+    for i, entry in enumerate(entries):
+        summary = entry.summary
+        # ドライバー未選択時は各セッションの最速ドライバーを表示する
+        targets = [d for d in drivers if summary.speed_trace(d) is not None] if drivers else [summary.fastest_driver()]
+        meta = get_session_meta(entry.session)
+        for drv in targets[:MAX_TRACES_PER_SESSION]:
+            trace = summary.speed_trace(drv)
+            if trace is None:
+                continue
+            lap_number, distance, speed = trace
+            style = meta.driver_style(drv)
+            ax.plot(distance, speed, color=style['color'], linestyle=SESSION_LINESTYLES[i % len(SESSION_LINESTYLES)],
+                    label=f"{entry.label} {drv} L{lap_number}")
+            plotted += 1
+    if not plotted:
+        tk.Label(frame, text="比較できるテレメトリがありません。", fg=COLOR_TEXT, bg=COLOR_FRAME).pack(expand=True)
+        return
+    ax.set_xlabel("Distance (m)", color=COLOR_TEXT)
+    ax.set_ylabel("Speed (km/h)", color=COLOR_TEXT)
+    _style_axes(fig, ax, "Fastest Lap Speed – Session Comparison", legend=True)
+    _pack_canvas(frame, fig)
+
+def _style_axes(fig, ax, title, legend=False):
+    ax.set_title(title, color=COLOR_TEXT, fontsize=9)
+    if legend:
+        leg = ax.legend(fontsize=7)
+        if leg:
+            plt.setp(leg.get_texts(), color=COLOR_TEXT)
+            leg.get_frame().set_facecolor(COLOR_FRAME)
+            leg.get_frame().set_edgecolor(COLOR_TEXT)
+    ax.grid(color="#333333")
+    ax.set_facecolor(COLOR_FRAME); fig.patch.set_facecolor(COLOR_FRAME)
+    ax.tick_params(colors=COLOR_TEXT, which='both')
+    ax.xaxis.label.set_color(COLOR_TEXT)
+    ax.yaxis.label.set_color(COLOR_TEXT)
+    for spine in ax.spines.values():
+        spine.set_edgecolor(COLOR_TEXT)
+    fig.tight_layout()
+
+def _pack_canvas(frame, fig):
+    canvas = FigureCanvasTkAgg(fig, master=frame)
+    canvas.draw()
+    canvas.get_tk_widget().pack(expand=True, fill="both")
@@ -1,10 +1,15 @@
 import tkinter as tk
-from tkinter import messagebox
+from tkinter import ttk, messagebox
 import fastf1
 import fastf1.plotting
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import matplotlib.pyplot as plt
 from config import COLOR_FRAME, COLOR_TEXT
+from analysis.session_meta import get_session_meta
+from analysis.telemetry_store import get_telemetry_store
+from tabs.linked_zoom import DistanceLink, LinkedZoom, lod_points
+
+FASTEST_LABEL = "最速"
 
 def init_speed(notebook):
     frame = tk.Frame(notebook, bg=COLOR_FRAME)
@@ -16,7 +21,7 @@ def _clear_frame_widgets(frame):
     for widget in frame.winfo_children():
         widget.destroy()
 
-def show_speed_compare(frame, session, drivers):
+def show_speed_compare(frame, session, drivers, link=None):
     _clear_frame_widgets(frame)
     tk.Label(frame, text="🚥 複数ドライバー速度比較", fg=COLOR_TEXT, bg=COLOR_FRAME).pack()
 
@@ -26,42 +31,83 @@ def show_speed_compare(frame, session, drivers):
 
     # fastf1.plotting.setup_mpl(misc_mpl_mods=False, color_scheme='fastf1') # Moved to main or apply selectively
     # Applying FastF1 styles can be good, but ensure it's what's desired globally or apply locally.
-    # For now, we rely on get_driver_style which should work fine.
+    # Driver colours and line styles come from the precomputed session metadata table.
+    store = get_telemetry_store(session)
+
+    drivers_with_data = [drv for drv in drivers if store.lap_numbers(drv)]
+    if not drivers_with_data:
+        messagebox.showinfo("データなし", "選択されたドライバーの有効なテレメトリデータが見つかりませんでした。")
+        tk.Label(frame, text="有効なテレメトリデータなし", fg=COLOR_TEXT, bg=COLOR_FRAME).pack(expand=True)
+        return
+
+    # ラップ選択: 「最速」または全ドライバー共通のラップ番号
+    all_laps = sorted({n for drv in drivers_with_data for n in store.lap_numbers(drv)})
+    picker_frame = tk.Frame(frame, bg=COLOR_FRAME)
+    picker_frame.pack(fill="x", padx=5)
+    tk.Label(picker_frame, text="ラップ", fg=COLOR_TEXT, bg=COLOR_FRAME).pack(side="left")
+    lap_var = tk.StringVar(value=FASTEST_LABEL)
+    lap_cmb = ttk.Combobox(picker_frame, textvariable=lap_var, state="readonly", width=8,
+                           values=[FASTEST_LABEL] + [str(n) for n in all_laps])
+    lap_cmb.pack(side="left", padx=5)
 
     fig = plt.Figure(figsize=(6,4), dpi=100, facecolor=COLOR_FRAME)
     ax = fig.add_subplot(111)
-    
-    at_least_one_driver_plotted = False
+    canvas = FigureCanvasTkAgg(fig, master=frame)
+    canvas.get_tk_widget().pack(expand=True, fill="both")
+
+    # 距離範囲は Telemetry / Map と共有し、範囲内のデータだけをテレメトリストアから切り出して描く
+    lines = []  # (drv, lap_number, Line2D)
+    def _apply_range(rng):
+        x0, x1 = rng or (None, None)
+        points = lod_points(ax)
+        for drv, lap_number, line in lines:
+            tel = store.window(drv, lap_number, x0, x1, points)
+            line.set_data(tel['Distance'], tel['Speed'])
+        ax.set_xlim(rng or zoom.extent)
+        ax.relim(); ax.autoscale_view(scalex=False)
+        canvas.draw_idle()
+    zoom = LinkedZoom(canvas, ax, session, link or DistanceLink(), _apply_range, (0, 1))
+
+    def _redraw(event=None):
+        # ax.clear() は SpanSelector の範囲表示の矩形まで外してしまうため、前回の線だけを取り除く
+        for _, _, line in lines:
+            line.remove()
+        lines[:] = draw_speed_compare(fig, ax, session, drivers_with_data, lap_var.get())
+        zoom.extent = (0, max((float(line.get_xdata()[-1]) for _, _, line in lines), default=1.0))
+        _apply_range(zoom.link.range)
+
+    lap_cmb.bind("<<ComboboxSelected>>", _redraw)
+    _redraw()
+
+
+def speed_traces(session, drivers, choice=FASTEST_LABEL):
+    """(ドライバー, ラップ番号, テレメトリ dict) のリスト。choice は「最速」またはラップ番号。"""
+    store = get_telemetry_store(session)
+    traces = []
     for drv in drivers:
-        lap = session.laps.pick_driver(drv).pick_fastest()
-        if lap is None or not hasattr(lap, 'Driver'):
-            print(f"ドライバー {drv} の最速ラップが見つかりません。スキップします。") # Log or show in UI status
+        lap_number = store.fastest_lap_number(drv) if choice == FASTEST_LABEL else int(choice)
+        tel = store.lap(drv, lap_number) if lap_number is not None else None
+        if tel is None or len(tel['Distance']) == 0:
+            print(f"ドライバー {drv} のラップ {lap_number} のテレメトリが見つかりません。スキップします。")
             continue
-        
-        try:
-            tel = lap.get_car_data().add_distance()
-            if tel is None or tel.empty:
-                print(f"ドライバー {drv} のテレメトリデータが見つかりません。スキップします。")
-                continue
-        except Exception as e:
-            print(f"ドライバー {drv} のテレメトリ取得エラー: {e}")
-            continue
-
-        style = fastf1.plotting.get_driver_style(identifier=drv,
-                                                 style=['color','linestyle'], # Removed 'marker' as it's not used by default in line plot
-                                                 session=session)
-        ax.plot(tel['Distance'], tel['Speed'], label=drv, **style)
-        at_least_one_driver_plotted = True
+        traces.append((drv, lap_number, tel))
+    return traces
 
-    if not at_least_one_driver_plotted:
-        messagebox.showinfo("データなし", "選択されたドライバーの有効なテレメトリデータが見つかりませんでした。")
-        tk.Label(frame, text="有効なテレメトリデータなし", fg=COLOR_TEXT, bg=COLOR_FRAME).pack(expand=True)
-        plt.close(fig)
-        return
+def draw_speed_compare(fig, ax, session, drivers, choice=FASTEST_LABEL):
+    # Tk に依存しない描画部分（サーバーモードからも使用する）。(ドライバー, ラップ番号, Line2D) のリストを返す
+    meta = get_session_meta(session)
+    lines = []
+    for drv, lap_number, tel in speed_traces(session, drivers, choice):
+        line, = ax.plot(tel['Distance'], tel['Speed'], label=f"{drv} L{lap_number}", **meta.driver_style(drv))
+        lines.append((drv, lap_number, line))
+    _style_axes(fig, ax, session, choice)
+    return lines
 
+def _style_axes(fig, ax, session, choice):
     ax.set_xlabel("Distance (m)", color=COLOR_TEXT)
     ax.set_ylabel("Speed (km/h)", color=COLOR_TEXT)
-    ax.set_title(f"Fastest Lap Speed Comparison – {session.event['EventName']} {session.event.year}",
+    lap_desc = "Fastest Lap" if choice == FASTEST_LABEL else f"Lap {choice}"
+    ax.set_title(f"{lap_desc} Speed Comparison – {session.event['EventName']} {session.event.year}",
                  color=COLOR_TEXT, fontsize=9)
     
     leg = ax.legend()
@@ -76,7 +122,3 @@ def show_speed_compare(frame, session, drivers):
     for spine in ax.spines.values():
         spine.set_edgecolor(COLOR_TEXT)
     fig.tight_layout()
-
-    canvas = FigureCanvasTkAgg(fig, master=frame)
-    canvas.draw()
-    canvas.get_tk_widget().pack(expand=True, fill="both")
\ No newline at end of file
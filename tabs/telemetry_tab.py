@@ -6,6 +6,8 @@ import fastf1
 from fastf1 import plotting # plotting might not be used directly here, but good to keep if styles are needed
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from config import COLOR_FRAME, COLOR_HIGHLIGHT, COLOR_TEXT
+from analysis.telemetry_store import get_telemetry_store
+from tabs.linked_zoom import DistanceLink, LinkedZoom, lod_points
 
 def init_telemetry(notebook):
     frame = tk.Frame(notebook, bg=COLOR_FRAME)
@@ -17,7 +19,7 @@ def _clear_frame_widgets(frame):
     for widget in frame.winfo_children():
         widget.destroy()
 
-def show_telemetry(frame, session, driver_list_one_elem): # Expects a list with one driver abbreviation
+def show_telemetry(frame, session, driver_list_one_elem, link=None): # Expects a list with one driver abbreviation
     _clear_frame_widgets(frame)
 
     if not driver_list_one_elem or not driver_list_one_elem[0]:
@@ -25,42 +27,80 @@ def show_telemetry(frame, session, driver_list_one_elem): # Expects a list with
         return
         
     driver_abbreviation = driver_list_one_elem[0]
-    tk.Label(frame, text=f"📈 {driver_abbreviation} 速度テレメトリ (最速ラップ)", fg=COLOR_TEXT, bg=COLOR_FRAME).pack()
+    tk.Label(frame, text=f"📈 {driver_abbreviation} 速度テレメトリ (★ = 最速ラップ)", fg=COLOR_TEXT, bg=COLOR_FRAME).pack()
 
 
-    # テレメトリデータ取得
-    lap = session.laps.pick_driver(driver_abbreviation).pick_fastest()
-    
-    if lap is None or not hasattr(lap, 'Driver'):
-        messagebox.showerror("データエラー", f"ドライバー {driver_abbreviation} の最速ラップが見つかりません。")
-        tk.Label(frame, text=f"{driver_abbreviation}\n最速ラップデータなし", fg=COLOR_TEXT, bg=COLOR_FRAME).pack(expand=True)
-        return
+    store = get_telemetry_store(session)
+    lap_numbers = store.lap_numbers(driver_abbreviation)
+    fastest = store.fastest_lap_number(driver_abbreviation)
 
-    try:
-        tel = lap.get_car_data().add_distance()
-        if tel is None or tel.empty:
-            messagebox.showerror("データエラー", f"ドライバー {driver_abbreviation} のテレメトリデータが見つかりません。")
-            tk.Label(frame, text=f"{driver_abbreviation}\nテレメトリデータなし", fg=COLOR_TEXT, bg=COLOR_FRAME).pack(expand=True)
-            return
-    except Exception as e:
-        messagebox.showerror("データエラー", f"ドライバー {driver_abbreviation} のテレメトリ取得中にエラー: {e}")
-        tk.Label(frame, text=f"{driver_abbreviation}\nテレメトリ取得エラー", fg=COLOR_TEXT, bg=COLOR_FRAME).pack(expand=True)
+    if not lap_numbers:
+        messagebox.showerror("データエラー", f"ドライバー {driver_abbreviation} のテレメトリデータが見つかりません。")
+        tk.Label(frame, text=f"{driver_abbreviation}\nテレメトリデータなし", fg=COLOR_TEXT, bg=COLOR_FRAME).pack(expand=True)
         return
 
+    # ラップ選択 (複数選択可、初期値は最速ラップ)
+    picker_frame = tk.Frame(frame, bg=COLOR_FRAME)
+    picker_frame.pack(side="left", fill="y", padx=(5, 0), pady=5)
+    tk.Label(picker_frame, text="ラップ", fg=COLOR_TEXT, bg=COLOR_FRAME).pack(anchor="w")
+    lap_lb = tk.Listbox(picker_frame, selectmode="extended", width=8, exportselection=False)
+    lap_lb.pack(side="left", fill="y", expand=True)
+    for n in lap_numbers:
+        lap_lb.insert(tk.END, f"{n}{' ★' if n == fastest else ''}")
+    default_pos = lap_numbers.index(fastest) if fastest in lap_numbers else 0
+    lap_lb.selection_set(default_pos)
+    lap_lb.see(default_pos)
 
     # プロット
     fig = plt.Figure(figsize=(6, 4), dpi=100, facecolor=COLOR_FRAME)
     ax  = fig.add_subplot(111)
-    ax.plot(tel['Distance'], tel['Speed'], color=COLOR_HIGHLIGHT, label=driver_abbreviation) # Added label
+    canvas = FigureCanvasTkAgg(fig, master=frame)
+    canvas.get_tk_widget().pack(expand=True, fill="both")
+
+    # 距離範囲は Speed Compare / Map と共有し、範囲内のデータだけをテレメトリストアから切り出して描く
+    lines = []  # (lap_number, Line2D)
+    def _apply_range(rng):
+        x0, x1 = rng or (None, None)
+        points = lod_points(ax)
+        for lap_number, line in lines:
+            tel = store.window(driver_abbreviation, lap_number, x0, x1, points)
+            line.set_data(tel['Distance'], tel['Speed'])
+        ax.set_xlim(rng or zoom.extent)
+        ax.relim(); ax.autoscale_view(scalex=False)
+        canvas.draw_idle()
+    zoom = LinkedZoom(canvas, ax, session, link or DistanceLink(), _apply_range, (0, 1))
+
+    def _redraw(event=None):
+        selected = [lap_numbers[i] for i in lap_lb.curselection()] or [lap_numbers[default_pos]]
+        # ax.clear() は SpanSelector の範囲表示の矩形まで外してしまうため、前回の線だけを取り除く
+        for _, line in lines:
+            line.remove()
+        lines.clear()
+        laps = store.laps(driver_abbreviation, selected)
+        for lap_number, tel in laps:
+            color = COLOR_HIGHLIGHT if lap_number == fastest else None
+            line, = ax.plot([], [], color=color, linewidth=1 if len(selected) > 1 else 1.5,
+                            label=f"{driver_abbreviation} L{lap_number}")
+            lines.append((lap_number, line))
+        zoom.extent = (0, max((float(tel['Distance'][-1]) for _, tel in laps), default=1.0))
+        _style_axes(fig, ax, session, driver_abbreviation, selected, fastest)
+        _apply_range(zoom.link.range)
+
+    lap_lb.bind("<<ListboxSelect>>", _redraw)
+    _redraw()
+
+
+def _style_axes(fig, ax, session, driver_abbreviation, selected, fastest):
     ax.set_xlabel("Distance (m)", color=COLOR_TEXT)
     ax.set_ylabel("Speed (km/h)", color=COLOR_TEXT)
+    lap_desc = "Fastest Lap" if selected == [fastest] else f"{len(selected)} Lap(s)"
     ax.set_title(
-        f"Fastest Lap Telemetry – {driver_abbreviation} – {session.event['EventName']} {session.event.year}",
+        f"{lap_desc} Telemetry – {driver_abbreviation} – {session.event['EventName']} {session.event.year}",
         color=COLOR_TEXT, fontsize=9
     )
     
     # Add legend
-    leg = ax.legend()
+    leg = ax.legend(fontsize=7 if len(selected) > 5 else None)
     if leg:
         plt.setp(leg.get_texts(), color=COLOR_TEXT)
         leg.get_frame().set_facecolor(COLOR_FRAME)
@@ -74,8 +114,3 @@ def show_telemetry(frame, session, driver_list_one_elem): # Expects a list with
 
     fig.patch.set_facecolor(COLOR_FRAME)
     fig.tight_layout()
-
-    # キャンバス表示
-    canvas = FigureCanvasTkAgg(fig, master=frame)
-    canvas.draw()
-    canvas.get_tk_widget().pack(expand=True, fill="both")
\ No newline at end of file
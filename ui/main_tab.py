@@ -1,11 +1,16 @@
+import gc
 import tkinter as tk
 from tkinter import ttk
 from tabs.overview import init_overview, show_overview
-from tabs.map_tab import init_map, show_map
+from tabs.map_tab import init_map, show_map, show_dominance
 from tabs.compare_tab import init_compare, show_compare
 from tabs.speed_tab import init_speed, show_speed_compare
 from tabs.scatter_tab import init_scatter, show_scatter_compare, init_single_scatter, show_single_driver_scatter # Added single scatter imports
 from tabs.telemetry_tab import init_telemetry, show_telemetry
+from tabs.race_tab import init_race, show_race_progress
+from tabs.session_compare_tab import init_session_compare, show_session_laptimes, show_session_speed
+from tabs.linked_zoom import DistanceLink
+from stall_watchdog import marks_operation
 
 class MainTab(ttk.Notebook):
     def __init__(self, master, **kwargs):
@@ -21,35 +26,77 @@ class MainTab(ttk.Notebook):
         self.laptime_compare_frame   = init_compare(self)
         self.speed_compare_frame     = init_speed(self) 
         self.scatter_compare_frame   = init_scatter(self)
+        self.race_frame              = init_race(self)
+        self.session_compare_frame   = init_session_compare(self)
 
+        # Telemetry / Speed Compare / Map で共有する距離範囲（リンクズーム）
+        self.distance_link = DistanceLink()
+
+
+    def release_figures(self):
+        # 置き換えられたセッションの図・キャンバスを破棄し、参照を断ってメモリを回収する
+        for frame in (self.map_frame, self.single_telemetry_frame, self.single_scatter_frame,
+                      self.laptime_compare_frame, self.speed_compare_frame, self.scatter_compare_frame,
+                      self.race_frame, self.session_compare_frame):
+            for widget in frame.winfo_children():
+                widget.destroy()
+        gc.collect()
 
     # tabs/*で定義された関数を呼び出すためのメソッド
+    @marks_operation
     def show_overview(self, *args, **kwargs):
         self.select(self.overview_frame) # Select tab before showing content
         return show_overview(self.overview_frame, *args, **kwargs)
 
+    @marks_operation
     def show_map(self, session):
         self.select(self.map_frame)
-        return show_map(self.map_frame, session)
+        return show_map(self.map_frame, session, self.distance_link)
+
+    @marks_operation
+    def show_track_dominance(self, session, drivers):
+        self.select(self.map_frame)
+        return show_dominance(self.map_frame, session, drivers)
 
     # Single Driver Views
+    @marks_operation
     def show_single_driver_telemetry(self, session, driver_list_one_elem):
         self.select(self.single_telemetry_frame)
-        return show_telemetry(self.single_telemetry_frame, session, driver_list_one_elem)
+        return show_telemetry(self.single_telemetry_frame, session, driver_list_one_elem, self.distance_link)
 
+    @marks_operation
     def show_single_driver_scatter(self, session, driver_list_one_elem):
         self.select(self.single_scatter_frame)
         return show_single_driver_scatter(self.single_scatter_frame, session, driver_list_one_elem[0])
 
     # Multi-Driver Comparison Views
+    @marks_operation
     def show_laptime_comparison(self, session, drivers): # Formerly show_multi_driver_compare
         self.select(self.laptime_compare_frame)
         return show_compare(self.laptime_compare_frame, session, drivers)
 
+    @marks_operation
     def show_speed_comparison(self, session, drivers): # Formerly show_multi_driver_speed
         self.select(self.speed_compare_frame)
-        return show_speed_compare(self.speed_compare_frame, session, drivers)
+        return show_speed_compare(self.speed_compare_frame, session, drivers, self.distance_link)
 
+    @marks_operation
     def show_scatter_comparison(self, session, drivers): # Formerly show_multi_lap_scatter
         self.select(self.scatter_compare_frame)
-        return show_scatter_compare(self.scatter_compare_frame, session, drivers)
\ No newline at end of file
+        return show_scatter_compare(self.scatter_compare_frame, session, drivers)
+
+    @marks_operation
+    def show_race_progress(self, session, drivers):
+        self.select(self.race_frame)
+        return show_race_progress(self.race_frame, session, drivers)
+
+    # Cross-Session Comparison Views (entries: session_pool.PinnedSession のリスト)
+    @marks_operation
+    def show_session_laptime_comparison(self, entries, drivers):
+        self.select(self.session_compare_frame)
+        return show_session_laptimes(self.session_compare_frame, entries, drivers)
+
+    @marks_operation
+    def show_session_speed_comparison(self, entries, drivers):
+        self.select(self.session_compare_frame)
+        return show_session_speed(self.session_compare_frame, entries, drivers)
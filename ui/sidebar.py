@@ -1,8 +1,13 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-from config import COLOR_FRAME, COLOR_TEXT, YEAR_LIST 
+from tkinter import ttk, messagebox, filedialog
+from config import COLOR_FRAME, COLOR_TEXT, COLOR_ACCENT, YEAR_LIST, EXPORT_FORMAT
+from exporter import FORMATS as EXPORT_FORMATS
 from service import FastF1Service
-import threading 
+from scheduler import CancelToken
+from analysis.session_meta import get_session_meta
+from analysis import session_cache
+from analysis.race_progress import RACE_SESSIONS
+from session_pool import SessionPool
 import datetime 
 
 class Sidebar(tk.Frame):
@@ -29,8 +34,19 @@ class Sidebar(tk.Frame):
         self.svc = svc
         self.main_tab = main_tab 
         self.current_session = None
+        self.current_key = None           # (year, gp, ses)
+        self.session_pool = SessionPool() # 比較用にピン留めしたセッション
+        self._pin_tokens = {}             # ロード中のピン留め: key -> CancelToken
+        self._schedule_token = CancelToken()
+        self._session_token = CancelToken()
 
         # --- Populate the internal_frame with sidebar content ---
+        self.offline_var = tk.BooleanVar(value=self.svc.offline)
+        tk.Checkbutton(self.internal_frame, text="オフラインモード (キャッシュのみ)", variable=self.offline_var,
+                       command=self._on_offline_toggle, bg=COLOR_FRAME, fg=COLOR_TEXT,
+                       selectcolor=COLOR_FRAME, activebackground=COLOR_FRAME) \
+          .pack(anchor="w", padx=10, pady=(10,0))
+
         tk.Label(self.internal_frame, text="開催年", bg=COLOR_FRAME, fg=COLOR_TEXT) \
           .pack(anchor="w", padx=10, pady=(10,0))
         year_frame = tk.Frame(self.internal_frame, bg=COLOR_FRAME)
@@ -65,6 +81,8 @@ class Sidebar(tk.Frame):
                                     values=["FP1","FP2","FP3","Q","R"])
         self.ses_cmb.pack(fill="x", padx=10)
         self.ses_cmb.bind("<<ComboboxSelected>>", self._on_session_select)
+        self.offline_lbl = tk.Label(self.internal_frame, text="", bg=COLOR_FRAME, fg=COLOR_ACCENT)
+        self.offline_lbl.pack(anchor="w", padx=10)
 
         tk.Label(self.internal_frame, text="ドライバー (複数選択可)", bg=COLOR_FRAME, fg=COLOR_TEXT) \
           .pack(anchor="w", padx=10, pady=(10,0))
@@ -79,14 +97,45 @@ class Sidebar(tk.Frame):
             ("ラップタイム比較 (複数)", self._cmd_show_laptime_comparison),
             ("速度比較 (複数)", self._cmd_show_speed_comparison),
             ("散布図比較 (複数)", self._cmd_show_scatter_comparison),
+            ("トラックドミナンス", self._cmd_show_track_dominance),
+            ("レース推移 (ギャップ/順位)", self._cmd_show_race_progress),
         ]
         for txt, cmd in buttons_config:
             ttk.Button(self.internal_frame, text=txt, command=cmd) \
                .pack(fill="x", padx=10, pady=3)
 
+        tk.Label(self.internal_frame, text="比較用セッション (ピン留め)", bg=COLOR_FRAME, fg=COLOR_TEXT) \
+          .pack(anchor="w", padx=10, pady=(10,0))
+        ttk.Button(self.internal_frame, text="📌 選択中のセッションを追加", command=self._cmd_pin_session) \
+           .pack(fill="x", padx=10, pady=3)
+        pin_frame = tk.Frame(self.internal_frame, bg=COLOR_FRAME)
+        pin_frame.pack(fill="x", padx=10)
+        self.pin_lb = tk.Listbox(pin_frame, selectmode="multiple", height=4, exportselection=False)
+        self.pin_lb.pack(side="left", fill="both", expand=True)
+        self.pool_lbl = tk.Label(self.internal_frame, text="", bg=COLOR_FRAME, fg=COLOR_TEXT)
+        self.pool_lbl.pack(anchor="w", padx=10)
+        for txt, cmd in [
+            ("ピン留めを解除", self._cmd_unpin_sessions),
+            ("セッション比較: ラップタイム分布", self._cmd_show_session_laptimes),
+            ("セッション比較: 最速ラップ速度", self._cmd_show_session_speed),
+        ]:
+            ttk.Button(self.internal_frame, text=txt, command=cmd) \
+               .pack(fill="x", padx=10, pady=3)
+        self._refresh_pins()
+
+        tk.Label(self.internal_frame, text="データ書き出し (表示中 + 選択したピン留め)", bg=COLOR_FRAME, fg=COLOR_TEXT) \
+          .pack(anchor="w", padx=10, pady=(10,0))
+        self.export_fmt_var = tk.StringVar(value=EXPORT_FORMAT)
+        ttk.Combobox(self.internal_frame, textvariable=self.export_fmt_var, state="readonly",
+                     values=list(EXPORT_FORMATS)).pack(fill="x", padx=10)
+        ttk.Button(self.internal_frame, text="💾 Parquet / Arrow に書き出す", command=self._cmd_export_sessions) \
+           .pack(fill="x", padx=10, pady=3)
+
         self.progress_var = tk.DoubleVar(value=0)
         self.progress = ttk.Progressbar(self.internal_frame, mode='determinate', variable=self.progress_var, maximum=100)
-        self.progress.pack(fill="x", padx=10, pady=10, anchor='s')
+        self.progress.pack(fill="x", padx=10, pady=(10,0), anchor='s')
+        self.status_lbl = tk.Label(self.internal_frame, text="", bg=COLOR_FRAME, fg=COLOR_TEXT)
+        self.status_lbl.pack(anchor="w", padx=10, pady=(0,10))
 
         self.internal_frame.update_idletasks()
         self._on_frame_configure() 
@@ -106,14 +155,32 @@ class Sidebar(tk.Frame):
         # For direct Button-4/5 binding, the command itself handles scroll, so no explicit check for event.num here needed
         # unless this method is also bound to Button-4/5, which is slightly redundant with the new direct bind.
 
-    def _start_loading_progress(self):
-        self.progress.configure(mode='indeterminate')
-        self.progress.start(10) 
+    def _start_loading_progress(self, staged=False):
+        # 段階的な進捗を受け取れる処理は determinate、それ以外は indeterminate で表示する
+        self.progress.stop()
+        if staged:
+            self.progress.configure(mode='determinate')
+            self.progress_var.set(0)
+        else:
+            self.progress.configure(mode='indeterminate')
+            self.progress.start(10) 
+        self.status_lbl.configure(text="読み込み中...")
+
+    def _on_load_progress(self, token, stage, percent):
+        if token.cancelled: return
+        self.progress_var.set(percent)
+        self.status_lbl.configure(text=f"読み込み中: {stage} ({percent}%)")
 
     def _stop_loading_progress(self, success=True):
         self.progress.stop()
         self.progress.configure(mode='determinate')
         self.progress_var.set(100 if success else 0)
+        self.status_lbl.configure(text="完了" if success else "失敗")
+
+    def _on_offline_toggle(self):
+        self.svc.set_offline(self.offline_var.get())
+        self.gp_lb.delete(0, tk.END) # 提供元が変わるのでスケジュールを読み直す
+        self._on_year_select(None)
 
     def _on_year_select(self, event):
         sel = self.year_lb.curselection()
@@ -124,38 +191,51 @@ class Sidebar(tk.Frame):
         self.year_var.set(year)
         self.gp_lb.delete(0, tk.END) 
         self.drv_lb.delete(0, tk.END) 
-        self.current_session = None   
+        self._release_current_session()
         if self.main_tab: self.main_tab.show_overview() 
 
+        self._schedule_token.cancel() # 古い年のスケジュール結果は破棄する
+        self._schedule_token = token = CancelToken()
         self._start_loading_progress()
-        threading.Thread(
-            target=self._load_schedule_thread,
-            args=(year,),
-            daemon=True
-        ).start()
-
-    def _load_schedule_thread(self, year):
-        fut = self.svc.get_event_schedule_async(year)
-        def _done_callback(future):
-            try:
-                schedule_df = future.result() # Pandas DataFrame expected
-                self.gp_lb.delete(0, tk.END)
-                if not schedule_df.empty: # Check if DataFrame is not empty
-                    # Assuming 'EventName' is a column in the DataFrame
-                    for gp_event_name in schedule_df['EventName']:
-                        self.gp_lb.insert(tk.END, gp_event_name)
-                self._stop_loading_progress(success=True)
-            except Exception as e:
-                self._stop_loading_progress(success=False)
-                messagebox.showerror("スケジュール取得エラー", f"エラー: {e}\nインターネット接続を確認するか、後で再試行してください。")
-        
-        fut.add_done_callback(lambda f: self.after(0, _done_callback, f))
+        self.svc.get_event_schedule_async(
+            year, token=token,
+            on_done=lambda schedule_df: self._on_schedule_loaded(token, year, schedule_df),
+            on_error=lambda e: self._on_schedule_failed(token, year, e))
+
+    def _on_schedule_loaded(self, token, year, schedule_df):
+        if token.cancelled: return
+        self._populate_schedule(year, schedule_df) # Pandas DataFrame expected
+        self._stop_loading_progress(success=True)
+
+    def _on_schedule_failed(self, token, year, e):
+        if token.cancelled: return
+        self._stop_loading_progress(success=False)
+        if not self.svc.offline and year in self.svc.offline_index.years:
+            # キャッシュ済みのイベントがあればオフラインモードに切り替えて表示する
+            self.offline_var.set(True)
+            self.svc.set_offline(True)
+            self._populate_schedule(year, self.svc.offline_index.event_schedule(year))
+            messagebox.showwarning("オフラインモード", f"スケジュールを取得できませんでした ({e})。\nキャッシュ済みのセッションのみを表示します。")
+            return
+        messagebox.showerror("スケジュール取得エラー", f"エラー: {e}\nインターネット接続を確認するか、後で再試行してください。")
 
+    def _populate_schedule(self, year, schedule_df):
+        self.gp_lb.delete(0, tk.END)
+        if schedule_df.empty: # Check if DataFrame is not empty
+            return
+        # Assuming 'EventName' is a column in the DataFrame
+        for gp_event_name in schedule_df['EventName']:
+            self.gp_lb.insert(tk.END, gp_event_name)
+            if self.svc.offline_index.available_sessions(year, gp_event_name):
+                # オフラインで読み込めるセッションがあるグランプリを強調表示
+                self.gp_lb.itemconfig(tk.END, fg=COLOR_ACCENT)
 
     def _on_gp_select(self, event):
         sel = self.gp_lb.curselection()
         if not sel: return
         self.gp_var.set(self.gp_lb.get(sel[0]))
+        available = self.svc.offline_index.available_sessions(self.year_var.get(), self.gp_var.get())
+        self.offline_lbl.configure(text=f"オフライン利用可: {', '.join(available)}" if available else "")
 
     def _on_session_select(self, event=None): 
         year = self.year_var.get()
@@ -165,52 +245,53 @@ class Sidebar(tk.Frame):
         if not (year and gp_name and session_type):
             messagebox.showinfo("選択不足", "年、グランプリ、セッションタイプをすべて選択してください。")
             return
+        if self.svc.offline and not self.svc.offline_index.is_available(year, gp_name, session_type):
+            messagebox.showinfo("オフラインモード", f"{year} {gp_name} – {session_type} はキャッシュに存在しません。")
+            return
 
-        self._start_loading_progress()
+        self._session_token.cancel() # ロード中の古いセッションと、その事前計算を打ち切る
+        self._session_token = token = CancelToken()
+        self._start_loading_progress(staged=True)
         self.drv_lb.delete(0, tk.END) 
-        self.current_session = None   
+        self._release_current_session()
         if self.main_tab: self.main_tab.show_overview() 
 
-        threading.Thread(
-            target=self._load_session_thread,
-            args=(year, gp_name, session_type),
-            daemon=True
-        ).start()
-
-    def _load_session_thread(self, year, gp, ses):
-        # Assuming FastF1Service is correctly typed and svc is an instance of it
-        fut = self.svc.load_session_async(year, gp, ses)
-        def _done_callback(future):
-            try:
-                session_obj = future.result() # Expecting a FastF1 Session object
-                self.current_session = session_obj
-                
-                self.drv_lb.delete(0, tk.END)
-                # Ensure session_obj is not None and has 'drivers' attribute
-                if session_obj and hasattr(session_obj, 'drivers') and session_obj.drivers:
-                    driver_abbreviations = []
-                    for drv_num in session_obj.drivers: # drivers is typically a list of driver numbers/IDs
-                        try:
-                            driver_info = session_obj.get_driver(drv_num) # Method to get driver details
-                            if driver_info is not None and 'Abbreviation' in driver_info:
-                                driver_abbreviations.append(driver_info['Abbreviation'])
-                        except Exception: 
-                            pass # Log error or handle missing driver info
-                    
-                    driver_abbreviations.sort() 
-                    for abbr in driver_abbreviations:
-                        self.drv_lb.insert(tk.END, abbr)
-
-                self._stop_loading_progress(success=True)
-                if self.main_tab: self.main_tab.show_map(self.current_session) 
-                messagebox.showinfo("ロード完了", f"{year} {gp} – {ses} を読み込みました。\nドライバーを選択して分析を開始してください。")
-
-            except Exception as e:
-                self._stop_loading_progress(success=False)
-                self.current_session = None 
-                messagebox.showerror("セッション取得エラー", f"エラー: {e}\nデータが存在しないか、ロードに失敗しました。")
-        
-        fut.add_done_callback(lambda f: self.after(0, _done_callback, f))
+        self.svc.load_session_async(
+            year, gp_name, session_type, token=token,
+            on_done=lambda session_obj: self._on_session_loaded(token, year, gp_name, session_type, session_obj),
+            on_error=lambda e: self._on_session_failed(token, e),
+            on_progress=lambda stage, percent: self._on_load_progress(token, stage, percent))
+
+    def _on_session_loaded(self, token, year, gp, ses, session_obj):
+        if token.cancelled: return
+        self.current_session = session_obj # Expecting a FastF1 Session object
+        self.current_key = (year, gp, ses)
+        self.svc.precompute_views_async(session_obj, token=token)
+
+        self.drv_lb.delete(0, tk.END)
+        # ドライバー一覧はワーカー側で構築済みのメタデータテーブルから取得する
+        for abbr in get_session_meta(session_obj).abbreviations:
+            self.drv_lb.insert(tk.END, abbr)
+
+        self._stop_loading_progress(success=True)
+        if self.main_tab: self.main_tab.show_map(self.current_session) 
+        messagebox.showinfo("ロード完了", f"{year} {gp} – {ses} を読み込みました。\nドライバーを選択して分析を開始してください。")
+
+    def _on_session_failed(self, token, e):
+        if token.cancelled: return
+        self._stop_loading_progress(success=False)
+        self.current_session = None 
+        self.current_key = None
+        messagebox.showerror("セッション取得エラー", f"エラー: {e}\nデータが存在しないか、ロードに失敗しました。")
+
+    def _release_current_session(self):
+        # 古いセッションとその計算結果・図を明示的に解放する
+        old_session, self.current_session = self.current_session, None
+        self.current_key = None
+        # ピン留めされたセッションは比較で使い続けるため、計算結果を残す
+        if old_session is not None and not self.session_pool.contains_session(old_session):
+            session_cache.release(old_session)
+        if self.main_tab: self.main_tab.release_figures()
 
     def _get_selected_drivers(self):
         return [self.drv_lb.get(i) for i in self.drv_lb.curselection()]
@@ -262,4 +343,124 @@ class Sidebar(tk.Frame):
         if len(drivers) > 4:
             messagebox.showinfo("ドライバー選択超過", "散布図比較では最大4名まで選択可能です。最初の4名が表示されます。")
             drivers = drivers[:4]
-        if self.main_tab: self.main_tab.show_scatter_comparison(self.current_session, drivers)
\ No newline at end of file
+        if self.main_tab: self.main_tab.show_scatter_comparison(self.current_session, drivers)
+
+    def _cmd_show_track_dominance(self):
+        if not self._ensure_session_loaded(): return
+        # ドライバー未選択の場合は全ドライバーで比較する（表示内でも選択を変更できる）
+        if self.main_tab: self.main_tab.show_track_dominance(self.current_session, self._get_selected_drivers())
+
+    def _cmd_show_race_progress(self):
+        if not self._ensure_session_loaded(): return
+        if self.current_session.name not in RACE_SESSIONS:
+            messagebox.showinfo("セッション種別", "レース推移は決勝・スプリントのセッションでのみ表示できます。")
+            return
+        # 選択したドライバーは強調表示される（未選択なら全員同じ太さ）
+        if self.main_tab: self.main_tab.show_race_progress(self.current_session, self._get_selected_drivers())
+
+    # --- Cross-session comparison ---
+    def _cmd_pin_session(self):
+        key = (self.year_var.get(), self.gp_var.get(), self.ses_var.get())
+        if not all(key):
+            messagebox.showinfo("選択不足", "年、グランプリ、セッションタイプをすべて選択してください。")
+            return
+        if key in self.session_pool or key in self._pin_tokens:
+            return
+        if self.svc.offline and not self.svc.offline_index.is_available(*key):
+            messagebox.showinfo("オフラインモード", f"{key[0]} {key[1]} – {key[2]} はキャッシュに存在しません。")
+            return
+
+        # 表示中のセッションなら再ロードせず、そのまま要約だけを計算する
+        loaded = self.current_session if key == self.current_key else None
+        self._pin_tokens[key] = token = CancelToken()
+        self._refresh_pins()
+        self.svc.pin_session_async(
+            *key, session=loaded, token=token,
+            on_done=lambda entry: self._on_pin_loaded(token, entry),
+            on_error=lambda e: self._on_pin_failed(token, key, e))
+
+    def _on_pin_loaded(self, token, entry):
+        if self._pin_tokens.get(entry.key) is not token: return
+        del self._pin_tokens[entry.key]
+        for evicted in self.session_pool.add(entry):
+            self._release_pinned(evicted)
+        self._refresh_pins()
+
+    def _on_pin_failed(self, token, key, e):
+        if self._pin_tokens.get(key) is not token: return
+        del self._pin_tokens[key]
+        self._refresh_pins()
+        messagebox.showerror("セッション取得エラー", f"{key[0]} {key[1]} – {key[2]}\nエラー: {e}")
+
+    def _release_pinned(self, entry):
+        if entry.session is not self.current_session:
+            session_cache.release(entry.session)
+
+    def _refresh_pins(self):
+        self.pin_lb.delete(0, tk.END)
+        for entry in self.session_pool.entries():
+            self.pin_lb.insert(tk.END, entry.label)
+        for key in self._pin_tokens:
+            self.pin_lb.insert(tk.END, f"{key[0]} {key[1]} {key[2]} (読み込み中...)")
+            self.pin_lb.itemconfig(tk.END, fg="#888888")
+        pool = self.session_pool
+        self.pool_lbl.configure(text=f"メモリ: {pool.used_bytes / 1024**2:.0f} / {pool.budget_bytes / 1024**2:.0f} MB")
+
+    def _selected_pins(self):
+        entries = self.session_pool.entries()
+        return [entries[i] for i in self.pin_lb.curselection() if i < len(entries)]
+
+    def _cmd_unpin_sessions(self):
+        for entry in self._selected_pins():
+            self.session_pool.remove(entry.key)
+            self._release_pinned(entry)
+        self._refresh_pins()
+
+    def _pins_for_comparison(self):
+        entries = self._selected_pins() or self.session_pool.entries()
+        if len(entries) < 2:
+            messagebox.showinfo("セッション選択", "比較には2つ以上のセッションをピン留めしてください。")
+            return None
+        self.session_pool.touch([e.key for e in entries])
+        return entries
+
+    def _cmd_show_session_laptimes(self):
+        entries = self._pins_for_comparison()
+        if entries and self.main_tab:
+            self.main_tab.show_session_laptime_comparison(entries, self._get_selected_drivers())
+
+    def _cmd_show_session_speed(self):
+        entries = self._pins_for_comparison()
+        if entries and self.main_tab:
+            self.main_tab.show_session_speed_comparison(entries, self._get_selected_drivers())
+
+    # --- Export ---
+    def _cmd_export_sessions(self):
+        sessions = [self.current_session] if self.current_session is not None else []
+        for entry in self._selected_pins():
+            if all(entry.session is not s for s in sessions):
+                sessions.append(entry.session)
+        if not sessions:
+            messagebox.showinfo("セッション未ロード", "書き出すセッションを読み込むか、ピン留めから選択してください。")
+            return
+        out_dir = filedialog.askdirectory(title="書き出し先フォルダ")
+        if not out_dir: return
+
+        results = {"files": [], "errors": [], "pending": len(sessions)}
+        def _finished(files=None, error=None):
+            results["pending"] -= 1
+            if error is not None: results["errors"].append(error)
+            else: results["files"].extend(files)
+            self.status_lbl.configure(text=f"書き出し中... 残り {results['pending']} セッション")
+            if results["pending"] == 0:
+                self._stop_loading_progress(success=not results["errors"])
+                if results["errors"]:
+                    messagebox.showerror("書き出しエラー", "\n".join(str(e) for e in results["errors"]))
+                else:
+                    messagebox.showinfo("書き出し完了", f"{len(results['files'])} ファイルを {out_dir} に書き出しました。")
+
+        self._start_loading_progress()
+        self.status_lbl.configure(text=f"書き出し中... 残り {len(sessions)} セッション")
+        self.svc.export_sessions_async(sessions, out_dir, fmt=self.export_fmt_var.get(),
+                                       on_done=lambda files: _finished(files=files),
+                                       on_error=lambda e: _finished(error=e))
@@ -0,0 +1,226 @@
+"""
+Cache Warm-up CLI
+レースウィーク前などに `_fastf1_cache` をシーズン単位でまとめて埋めるためのコマンドラインツールです。
+同時実行数を制限して取得し、完了したセッションをチェックポイントファイルに記録するため、中断しても再開できます。
+取得中のセッションの分も見込み、キャッシュが CACHE_SIZE_LIMIT_GB に達する前に新しい取得を止めます
+（上限を超えると、起動時のキャッシュ整理で古いセッションから削除されるため）。
+
+例:
+    python warmup.py --years 2023-2025 --sessions Q,R
+    python warmup.py --years 2024 --sessions FP1,FP2,FP3,Q,R --concurrency 3 --no-telemetry
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+from concurrent.futures import wait, FIRST_COMPLETED
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from scheduler import CancelToken
+
+SIZE_LIMIT_EXIT_CODE = 2
+INTERRUPTED_EXIT_CODE = 130
+# 1 セッション分のキャッシュサイズの初期見積もり（テレメトリ込みの決勝程度）。取得するたびに実測の最大値で更新する
+DEFAULT_SESSION_BYTES = 200 * 1024**2
+
+
+def is_missing_session(error) -> bool:
+    """FastF1 が「そのイベントにはこのセッション種別が無い」と判断した例外か（スプリント週末の FP2 など）。"""
+    return isinstance(error, ValueError) and "does not exist" in str(error)
+
+
+def parse_years(spec: str):
+    """"2021,2023-2025" -> [2021, 2023, 2024, 2025]"""
+    years = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = (int(x) for x in part.split('-', 1))
+            years.update(range(min(start, end), max(start, end) + 1))
+        else:
+            years.add(int(part))
+    return sorted(years)
+
+
+class Checkpoint:
+    """完了・失敗・スキップしたセッションを JSON に記録する。書き込みは置き換えで行い、途中で壊れないようにする。"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.done, self.skipped, self.failed = set(), set(), {}
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                self.done = set(data.get("done", []))
+                self.skipped = set(data.get("skipped", []))
+                self.failed = dict(data.get("failed", {}))
+            except (OSError, ValueError) as e:
+                logging.warning(f"Ignoring unreadable checkpoint {self.path}: {e}")
+
+    @staticmethod
+    def key(year, gp, ses):
+        return f"{year}|{gp}|{ses}"
+
+    def is_finished(self, key):
+        return key in self.done or key in self.skipped
+
+    def mark(self, key, status, error=None):
+        self.failed.pop(key, None)
+        if status == "done":
+            self.done.add(key)
+        elif status == "skipped":
+            self.skipped.add(key)
+        else:
+            self.failed[key] = str(error)
+        self.save()
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps({"done": sorted(self.done), "skipped": sorted(self.skipped),
+                                   "failed": self.failed}, ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+class ServiceSource:
+    """FastF1Service を通してスケジュールを取得し、セッションを先読みするデータソース。"""
+
+    def __init__(self, svc, telemetry=True):
+        self.svc = svc
+        self.telemetry = telemetry
+
+    def events(self, year):
+        schedule = self.svc.get_event_schedule_async(year).result()
+        if 'EventFormat' in schedule.columns:
+            schedule = schedule[schedule['EventFormat'] != 'testing']
+        now = pd.Timestamp(datetime.now())
+        schedule = schedule[schedule['EventDate'] < now] # まだ開催されていないイベントは取得できない
+        return list(schedule['EventName'])
+
+    def fetch_async(self, year, gp, ses, token):
+        # 失敗は WarmupRunner._record で future から扱うため、スケジューラ側ではログしない
+        return self.svc.prefetch_session_async(year, gp, ses, telemetry=self.telemetry, token=token,
+                                               on_error=lambda e: None)
+
+
+class WarmupRunner:
+    def __init__(self, source, checkpoint: Checkpoint, cache_size, size_limit_bytes, concurrency=2,
+                 session_bytes=DEFAULT_SESSION_BYTES):
+        self.source = source
+        self.checkpoint = checkpoint
+        self.cache_size = cache_size   # 現在のキャッシュサイズ (bytes) を返す関数
+        self.size_limit_bytes = size_limit_bytes
+        self.concurrency = max(1, concurrency)
+        self.session_bytes = session_bytes  # 1 セッションで増えるキャッシュサイズの見積もり（観測した最大値）
+        self.token = CancelToken()
+
+    def has_room(self, in_flight):
+        """取得中のセッションと新しく始める 1 件が最大サイズまで増えても上限に収まるか。"""
+        return self.cache_size() + (in_flight + 1) * self.session_bytes <= self.size_limit_bytes
+
+    def plan(self, years, sessions):
+        for year in years:
+            try:
+                events = self.source.events(year)
+            except Exception as e:
+                logging.error(f"Could not get schedule for {year}: {e}")
+                continue
+            for gp in events:
+                for ses in sessions:
+                    key = Checkpoint.key(year, gp, ses)
+                    if not self.checkpoint.is_finished(key):
+                        yield year, gp, ses
+
+    def run(self, years, sessions) -> int:
+        pending = {}  # future -> (key, 開始時のキャッシュサイズ)
+        jobs = self.plan(years, sessions)
+        exhausted = size_exceeded = False
+        try:
+            while True:
+                while not (exhausted or size_exceeded) and len(pending) < self.concurrency:
+                    if not self.has_room(len(pending)):
+                        logging.warning("Cache size limit would be exceeded; not starting new fetches.")
+                        size_exceeded = True
+                        break
+                    job = next(jobs, None)
+                    if job is None:
+                        exhausted = True
+                        break
+                    logging.info(f"Fetching {job[0]} {job[1]} {job[2]}")
+                    task = self.source.fetch_async(*job, token=self.token)
+                    pending[task.future] = (Checkpoint.key(*job), self.cache_size())
+                if not pending:
+                    break
+                finished, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    key, size_before = pending.pop(fut)
+                    # 同時に取得中のセッションの増加分も含むため、見積もりは大きめ（安全側）になる
+                    self.session_bytes = max(self.session_bytes, self.cache_size() - size_before)
+                    self._record(key, fut)
+        except KeyboardInterrupt:
+            logging.warning("Interrupted; progress saved to checkpoint. Re-run to resume.")
+            self.token.cancel()
+            self.checkpoint.save()
+            return INTERRUPTED_EXIT_CODE
+
+        self.checkpoint.save()
+        logging.info(f"Warm-up finished: {len(self.checkpoint.done)} done, "
+                     f"{len(self.checkpoint.skipped)} skipped, {len(self.checkpoint.failed)} failed")
+        return SIZE_LIMIT_EXIT_CODE if size_exceeded else 0
+
+    def _record(self, key, fut):
+        try:
+            fut.result()
+        except Exception as e:
+            if is_missing_session(e):
+                # 存在しないセッション種別（スプリント週末の FP2 など）は再試行しない
+                logging.info(f"Skipped {key}: {e}")
+                self.checkpoint.mark(key, "skipped")
+            else:
+                logging.error(f"Failed {key}: {e}")
+                self.checkpoint.mark(key, "failed", e)
+        else:
+            logging.info(f"Cached {key}")
+            self.checkpoint.mark(key, "done")
+
+
+def main(argv=None):
+    from service import FastF1Service, CacheManager, CACHE_DIR, WARMUP_CHECKPOINT_NAME
+
+    parser = argparse.ArgumentParser(description="Pre-populate the FastF1 cache for whole seasons.")
+    parser.add_argument("--years", required=True, help="対象年 (例: 2024, 2021-2023, 2019,2021-2022)")
+    parser.add_argument("--sessions", default="FP1,FP2,FP3,Q,R", help="セッション種別のカンマ区切り (既定: FP1,FP2,FP3,Q,R)")
+    parser.add_argument("--concurrency", type=int, default=2, help="同時に取得するセッション数 (既定: 2、上限はスケジューラのワーカー数)")
+    parser.add_argument("--no-telemetry", action="store_true", help="テレメトリ（car/position data）を取得しない")
+    parser.add_argument("--checkpoint", default=str(CACHE_DIR / WARMUP_CHECKPOINT_NAME),
+                        help="チェックポイントファイルのパス")
+    parser.add_argument("--restart", action="store_true", help="チェックポイントを無視して最初から取得する")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO,
+                        format="[%(asctime)s] %(levelname)s %(filename)s:%(lineno)d %(message)s")
+    logging.getLogger("fastf1").setLevel(logging.WARNING)
+
+    checkpoint_path = Path(args.checkpoint)
+    if args.restart and checkpoint_path.exists():
+        checkpoint_path.unlink()
+
+    svc = FastF1Service(offline=False)
+    runner = WarmupRunner(ServiceSource(svc, telemetry=not args.no_telemetry),
+                          Checkpoint(checkpoint_path),
+                          cache_size=CacheManager.cache_size_bytes,
+                          size_limit_bytes=CacheManager.size_limit_bytes(),
+                          concurrency=args.concurrency)
+    sessions = [s.strip() for s in args.sessions.split(",") if s.strip()]
+    return runner.run(parse_years(args.years), sessions)
+
+
+if __name__ == "__main__":
+    sys.exit(main())